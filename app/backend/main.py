@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Add parent directory to path so we can import from 'src'
@@ -9,6 +11,19 @@ parent_dir = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(parent_dir))
 
 from app.backend.routes import api_router
+from src.tools.api import aclose_async_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background work when the server starts and release shared clients when it stops."""
+    # Optionally build the Warren Buffett chat agent at startup instead of on the first query
+    if os.getenv("WARREN_BUFFETT_EAGER_INIT", "0") == "1":
+        from app.backend.services.warren_buffett_chat_agent import warm_up_warren_buffett_agent
+        # Run in the background so the server starts accepting requests right away
+        app.state.warm_up_task = asyncio.create_task(warm_up_warren_buffett_agent())
+    yield
+    # Release the pooled connections of the shared async API client
+    await aclose_async_client()
 
 # Create FastAPI app with metadata
 app = FastAPI(
@@ -58,6 +73,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",  # Swagger UI
     redoc_url="/redoc",  # ReDoc UI
+    lifespan=lifespan,
 )
 
 # Configure CORS for development
@@ -3,6 +3,7 @@ from fastapi.responses import StreamingResponse
 import asyncio
 from datetime import datetime
 from typing import Optional
+import orjson
 from langsmith import traceable
 
 from app.backend.models.schemas import BacktestRequest, BacktestResult, ErrorResponse
@@ -12,6 +13,10 @@ from src.utils.weight_manager import weight_tracker
 
 router = APIRouter(prefix="/backtest")
 
+# Fixed SSE frames sent by the stream endpoint
+_KEEPALIVE_FRAME = "event: keepalive\ndata: {}\n\n"
+_TIMEOUT_FRAME = "event: timeout\ndata: {\"message\": \"Stream timeout - session may have ended\"}\n\n"
+
 
 @router.post("/start")
 async def start_backtest(
@@ -129,14 +134,15 @@ async def stream_backtest(
                     
                     # If too many consecutive timeouts, assume the session is dead
                     if consecutive_timeouts >= max_consecutive_timeouts:
-                        yield f"event: timeout\ndata: {{\"message\": \"Stream timeout - session may have ended\"}}\n\n"
+                        yield _TIMEOUT_FRAME
                         break
                     
                     # Send keepalive
-                    yield "event: keepalive\ndata: {}\n\n"
+                    yield _KEEPALIVE_FRAME
                     
         except Exception as e:
-            yield f"event: error\ndata: {{\"message\": \"Stream error: {str(e)}\"}}\n\n"
+            # Exception text can contain quotes, backslashes or newlines, so JSON-escape it
+            yield "event: error\ndata: {\"message\": " + orjson.dumps(f"Stream error: {e}").decode() + "}\n\n"
         finally:
             # Clean up the session after streaming completes
             try:
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 import asyncio
-import json
+import orjson
 from datetime import datetime
 
 router = APIRouter()
@@ -30,7 +30,7 @@ async def ping():
             data = {"ping": f"ping {i+1}/5", "timestamp": i + 1}
 
             # Format as SSE
-            yield f"data: {json.dumps(data)}\n\n"
+            yield f"data: {orjson.dumps(data).decode()}\n\n"
 
             # Wait 1 second
             await asyncio.sleep(1)
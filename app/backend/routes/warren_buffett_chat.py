@@ -4,13 +4,13 @@ Warren Buffett Chat API Routes
 from fastapi import APIRouter, HTTPException, Query, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
+import os
 import logging
-import json
+import orjson
 import asyncio
 from datetime import datetime
 
-from app.backend.services.warren_buffett_chat_agent import process_warren_buffett_query
 from app.backend.middleware.auth import verify_api_key
 from app.backend.models import ErrorResponse, ChatMessage, ChatResponse
 
@@ -20,6 +20,63 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/warren-buffett", tags=["warren-buffett-chat"])
 
+# Optional pause between streamed events (seconds); by default the client and the
+# ASGI server provide the flow control
+STREAM_PACING_DELAY = float(os.getenv("WARREN_BUFFETT_STREAM_PACING_DELAY", "0"))
+
+# Fixed-shape SSE frames: only the JSON-escaped values change between streams.
+# Frames are built as bytes so StreamingResponse can write them without re-encoding.
+_ERROR_FRAME_TEMPLATE = b'data: {"type":"error","data":{"error":%s,"message":"Analysis failed","success":false},"timestamp":"%s"}\n\n'
+_STREAM_END_FRAME_TEMPLATE = b'data: {"type":"stream_end","data":{"message":"Stream completed"},"timestamp":"%s"}\n\n'
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+async def _coalesce_frames(
+    frames: AsyncIterator[bytes],
+    target_bytes: int = 4096,
+    flush_interval: float = 0.02
+) -> AsyncIterator[bytes]:
+    """
+    Group small SSE frames into larger writes.
+    
+    Frames are buffered until target_bytes accumulate or flush_interval passes
+    without a new frame, so bursts of events share one ASGI send while a lone
+    event is still delivered promptly.
+    """
+    buffer = bytearray()
+    iterator = frames.__aiter__()
+    next_frame = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {next_frame}, timeout=flush_interval if buffer else None
+            )
+            if not done:
+                # Producer went quiet; send what we have
+                yield bytes(buffer)
+                buffer.clear()
+                continue
+            
+            try:
+                frame = next_frame.result()
+            except StopAsyncIteration:
+                break
+            
+            buffer += frame
+            next_frame = asyncio.ensure_future(iterator.__anext__())
+            if len(buffer) >= target_bytes:
+                yield bytes(buffer)
+                buffer.clear()
+        
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        next_frame.cancel()
+        # Let the pending __anext__ unwind before closing the producer, so its own
+        # finally (which releases the agent's concurrency slot) runs now
+        await asyncio.wait({next_frame})
+        await iterator.aclose()
+
 class StreamingChatMessage(BaseModel):
     query: str
     chat_history: List[ChatMessage] = []
@@ -36,6 +93,9 @@ async def analyze_warren_buffett(
         logger.info(f"🎯 ROUTE: /analyze received query: '{query}'")
         logger.info(f"🔐 API_KEY: Authentication successful")
         
+        # Imported on first use: the agent module pulls in the LangChain agent stack,
+        # which app startup doesn't otherwise need
+        from app.backend.services.warren_buffett_chat_agent import process_warren_buffett_query
         result = await process_warren_buffett_query(query)
         
         logger.info(f"✅ ROUTE: Analysis completed successfully")
@@ -92,13 +152,15 @@ async def analyze_warren_buffett_streaming(
                 event_count = 0
                 async for event_json in agent.analyze_streaming(request.query, chat_history):
                     event_count += 1
-                    logger.info(f"📡 STREAMING EVENT {event_count}: {event_json[:100]}...")
+                    # Per-event logging is debug-only: LLM tokens arrive as individual events
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"📡 STREAMING EVENT {event_count}: {event_json[:100].decode(errors='ignore')}...")
                     
                     # Format as Server-Sent Event
-                    yield f"data: {event_json}\n\n"
+                    yield _SSE_PREFIX + event_json + _SSE_SUFFIX
                     
-                    # Small delay to prevent overwhelming the client
-                    await asyncio.sleep(0.1)
+                    if STREAM_PACING_DELAY:
+                        await asyncio.sleep(STREAM_PACING_DELAY)
                 
                 logger.info(f"✅ STREAMING: Generated {event_count} events successfully")
                     
@@ -106,28 +168,14 @@ async def analyze_warren_buffett_streaming(
                 logger.error(f"❌ STREAMING ERROR: {str(e)}")
                 logger.exception("Full streaming error traceback:")
                 # Send error event
-                error_event = {
-                    "type": "error",
-                    "data": {
-                        "error": str(e),
-                        "message": "Analysis failed",
-                        "success": False
-                    },
-                    "timestamp": datetime.now().isoformat()
-                }
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield _ERROR_FRAME_TEMPLATE % (orjson.dumps(str(e)), datetime.now().isoformat().encode())
             
             # Send final stream end event
-            end_event = {
-                "type": "stream_end",
-                "data": {"message": "Stream completed"},
-                "timestamp": datetime.now().isoformat()
-            }
-            yield f"data: {json.dumps(end_event)}\n\n"
+            yield _STREAM_END_FRAME_TEMPLATE % datetime.now().isoformat().encode()
             logger.info(f"🏁 STREAMING: Stream completed")
         
         return StreamingResponse(
-            event_stream(),
+            _coalesce_frames(event_stream()),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
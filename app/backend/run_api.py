@@ -40,5 +40,7 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=reload,
+        # "auto" selects uvloop when installed (it ships with fastapi[standard])
+        loop="auto",
         log_level="info"
     ) 
\ No newline at end of file
@@ -1,16 +1,16 @@
 """
 LangChain Chat Agent for Natural Language Financial Analysis
 """
-import os
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+import re
+import sys
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Callable
+from datetime import datetime
+from functools import lru_cache
 
-from langchain.agents import create_react_agent, AgentExecutor
 from langchain.tools import tool
-from langchain_core.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.agents.format_scratchpad import format_log_to_str
-from langchain.agents.output_parsers import ReActSingleInputOutputParser
 
 # Import analysis functions
 from src.agents.peter_lynch import (
@@ -34,20 +34,88 @@ from src.agents.aswath_damodaran import (
 from src.tools.api import (
     get_financial_metrics,
     get_market_cap,
-    search_line_items,
-    get_prices
+    search_line_items
 )
 
 # Import existing LLM infrastructure
 from src.llm.models import get_model
+from app.backend.services.tickers import find_tickers
 
+logger = logging.getLogger(__name__)
+
+# Strips a ``` / ```json fence the model sometimes wraps its JSON answer in
+CODE_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+TICKER_EXTRACTION_PROMPT = """Extract every stock ticker symbol mentioned in the question below.
+Respond with ONLY a JSON list of uppercase ticker strings, for example ["AAPL", "MSFT"].
+Respond with [] if no tickers are mentioned.
+
+Question: {query}"""
+
+COMPARISON_PROMPT = """You are an expert financial analyst applying Peter Lynch's growth investing methodology.
+
+Answer the question below using the Peter Lynch valuation, growth and fundamentals analyses provided for each ticker.
+Compare the companies side by side, present the key metrics in a Markdown table, and finish with a ranked
+investment recommendation including an overall assessment and confidence level for each ticker.
+
+Format ALL of your response using Markdown (##/### headings, **bold**, *italics*, bullet points and tables).
+
+Question: {query}
+
+Analysis results (JSON):
+{results}"""
+
+@lru_cache(maxsize=1024)
 def clean_ticker(ticker: str) -> str:
     """Clean and normalize ticker symbol."""
-    return ticker.strip().strip("'\"").upper()
+    # Interned so every lookup for a ticker shares one string in downstream caches
+    return sys.intern(ticker.strip().strip("'\"").upper())
+
+def analysis_tool(analysis_type: str):
+    """
+    Turn a single-ticker analysis function into a LangChain tool.
+    
+    The decorated function receives the cleaned ticker and today's end date and
+    returns the analysis result; ticker cleaning, the response envelope and error
+    handling are shared by every tool.
+    """
+    def decorator(analyze: Callable[[str, str], Dict[str, Any]]):
+        def run(ticker: str) -> Dict[str, Any]:
+            # One clock read per call: the end date and the result timestamp share it
+            now = datetime.now()
+            try:
+                # Clean ticker (remove quotes if present)
+                ticker = clean_ticker(ticker)
+                
+                # Fetch required data
+                result = analyze(ticker, now.strftime("%Y-%m-%d"))
+                
+                return {
+                    "ticker": ticker,
+                    "analysis_type": analysis_type,
+                    "result": result,
+                    "timestamp": now.isoformat()
+                }
+                
+            except Exception as e:
+                return {
+                    "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
+                    "analysis_type": analysis_type,
+                    "error": str(e),
+                    "result": {"score": 0, "details": f"Error: {str(e)}"},
+                    "timestamp": now.isoformat()
+                }
+        
+        # The tool takes its name and description from these; the signature
+        # (ticker only) is taken from run itself
+        run.__name__ = analyze.__name__
+        run.__doc__ = analyze.__doc__
+        return tool(run)
+    return decorator
 
 # Define tools for LangChain agent
-@tool
-def peter_lynch_valuation_analysis(ticker: str) -> Dict[str, Any]:
+@analysis_tool("peter_lynch_valuation")
+def peter_lynch_valuation_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze a stock's valuation using Peter Lynch's approach, focusing on PEG ratio and growth metrics.
     
@@ -57,47 +125,24 @@ def peter_lynch_valuation_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing valuation analysis with score, details, and key metrics
     """
-    try:
-        # Clean ticker (remove quotes if present)
-        ticker = clean_ticker(ticker)
-        
-        # Fetch required data
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        line_items = search_line_items(
-            ticker,
-            [
-                "earnings_per_share", "revenue", "net_income", "outstanding_shares",
-                "book_value_per_share", "dividends_and_other_cash_distributions"
-            ],
-            end_date,
-            period="annual",
-            limit=5
-        )
-        
-        market_cap = get_market_cap(ticker, end_date)
-        
-        # Run Peter Lynch valuation analysis
-        result = analyze_lynch_valuation(line_items, market_cap)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "peter_lynch_valuation",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "peter_lynch_valuation",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    line_items = search_line_items(
+        ticker,
+        [
+            "earnings_per_share", "revenue", "net_income", "outstanding_shares",
+            "book_value_per_share", "dividends_and_other_cash_distributions"
+        ],
+        end_date,
+        period="annual",
+        limit=5
+    )
+    
+    market_cap = get_market_cap(ticker, end_date)
+    
+    # Run Peter Lynch valuation analysis
+    return analyze_lynch_valuation(line_items, market_cap)
 
-@tool
-def peter_lynch_growth_analysis(ticker: str) -> Dict[str, Any]:
+@analysis_tool("peter_lynch_growth")
+def peter_lynch_growth_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze a stock's growth potential using Peter Lynch's growth investing principles.
     
@@ -107,42 +152,19 @@ def peter_lynch_growth_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing growth analysis with score, details, and key metrics
     """
-    try:
-        # Clean ticker (remove quotes if present)
-        ticker = clean_ticker(ticker)
-        
-        # Fetch required data
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        line_items = search_line_items(
-            ticker,
-            ["earnings_per_share", "revenue", "net_income"],
-            end_date,
-            period="annual", 
-            limit=5
-        )
-        
-        # Run Peter Lynch growth analysis
-        result = analyze_lynch_growth(line_items)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "peter_lynch_growth",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "peter_lynch_growth", 
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    line_items = search_line_items(
+        ticker,
+        ["earnings_per_share", "revenue", "net_income"],
+        end_date,
+        period="annual", 
+        limit=5
+    )
+    
+    # Run Peter Lynch growth analysis
+    return analyze_lynch_growth(line_items)
 
-@tool
-def peter_lynch_fundamentals_analysis(ticker: str) -> Dict[str, Any]:
+@analysis_tool("peter_lynch_fundamentals")
+def peter_lynch_fundamentals_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze a stock's fundamental health using Peter Lynch's fundamental analysis approach.
     
@@ -152,45 +174,22 @@ def peter_lynch_fundamentals_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing fundamentals analysis with score, details, and key metrics
     """
-    try:
-        # Clean ticker (remove quotes if present)
-        ticker = clean_ticker(ticker)
-        
-        # Fetch required data
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        line_items = search_line_items(
-            ticker,
-            [
-                "total_debt", "current_assets", "current_liabilities", 
-                "total_assets", "net_income", "revenue"
-            ],
-            end_date,
-            period="annual",
-            limit=5
-        )
-        
-        # Run Peter Lynch fundamentals analysis
-        result = analyze_lynch_fundamentals(line_items)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "peter_lynch_fundamentals",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "peter_lynch_fundamentals",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    line_items = search_line_items(
+        ticker,
+        [
+            "total_debt", "current_assets", "current_liabilities", 
+            "total_assets", "net_income", "revenue"
+        ],
+        end_date,
+        period="annual",
+        limit=5
+    )
+    
+    # Run Peter Lynch fundamentals analysis
+    return analyze_lynch_fundamentals(line_items)
 
-@tool
-def warren_buffett_fundamentals_analysis(ticker: str) -> Dict[str, Any]:
+@analysis_tool("warren_buffett_fundamentals")
+def warren_buffett_fundamentals_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze a stock using Warren Buffett's fundamental analysis approach.
     
@@ -200,38 +199,58 @@ def warren_buffett_fundamentals_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing Buffett-style analysis with score, details, and key metrics
     """
-    try:
-        # Clean ticker (remove quotes if present)
-        ticker = clean_ticker(ticker)
-        
-        # Fetch required data
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
-        
-        # Run Warren Buffett fundamentals analysis
-        result = analyze_fundamentals(metrics)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_fundamentals",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_fundamentals",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
+    
+    # Run Warren Buffett fundamentals analysis
+    return analyze_fundamentals(metrics)
+
+async def peter_lynch_full_analysis(ticker: str) -> Dict[str, Any]:
+    """Run the Peter Lynch valuation, growth and fundamentals analyses for one ticker concurrently."""
+    valuation, growth, fundamentals = await asyncio.gather(
+        peter_lynch_valuation_analysis.ainvoke(ticker),
+        peter_lynch_growth_analysis.ainvoke(ticker),
+        peter_lynch_fundamentals_analysis.ainvoke(ticker)
+    )
+    return {
+        "valuation": valuation,
+        "growth": growth,
+        "fundamentals": fundamentals
+    }
+
+@tool
+async def peter_lynch_compare_tickers(tickers: str) -> Dict[str, Any]:
+    """
+    Compare several stocks at once using Peter Lynch's valuation, growth and fundamentals analyses.
+    Use this instead of calling the single-ticker Peter Lynch tools once per stock.
+    
+    Args:
+        tickers: Comma-separated ticker symbols (e.g., AAPL, MSFT, GOOG)
+    
+    Returns:
+        Dict mapping each ticker to its valuation, growth and fundamentals analyses
+    """
+    symbols = list(dict.fromkeys(clean_ticker(t) for t in tickers.split(",") if t.strip()))
+    
+    # Fan out the per-ticker pipelines instead of running them one ReAct turn at a time
+    results = await asyncio.gather(*[peter_lynch_full_analysis(t) for t in symbols])
+    
+    return {
+        "tickers": symbols,
+        "analysis_type": "peter_lynch_comparison",
+        "results": dict(zip(symbols, results)),
+        "timestamp": datetime.now().isoformat()
+    }
 
 class FinancialAnalysisAgent:
     """LangChain agent for natural language financial analysis."""
     
     def __init__(self, model_name: str = "gpt-4o", model_provider: str = "openai"):
+        # The agent framework is only needed once an agent is built; importing it
+        # here keeps it off the import path of modules that just use the tools
+        from langchain.agents import create_react_agent, AgentExecutor
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.tools import render_text_description
+        
         self.model_name = model_name
         self.model_provider = model_provider
         
@@ -245,6 +264,7 @@ class FinancialAnalysisAgent:
             peter_lynch_valuation_analysis,
             peter_lynch_growth_analysis,
             peter_lynch_fundamentals_analysis,
+            peter_lynch_compare_tickers,
             warren_buffett_fundamentals_analysis
         ]
         
@@ -308,6 +328,7 @@ Use proper Markdown formatting including ##/### headings, **bold**, *italics*, b
 
 IMPORTANT: When calling tools, pass ONLY the ticker symbol without quotes or extra characters.
 For example: Use "TSLA" not "'TSLA'" or "Tesla"
+When comparing several stocks, call peter_lynch_compare_tickers ONCE with all tickers comma-separated (e.g. "AAPL, MSFT").
 
 TOOLS:
 ------
@@ -336,13 +357,20 @@ Begin!
 Question: {input}
 Thought: {agent_scratchpad}"""
 
-        self.prompt = PromptTemplate.from_template(template)
+        # Tools are fixed for the agent's lifetime, so render them into the prompt once;
+        # each ReAct step then only substitutes {input} and {agent_scratchpad}
+        rendered_tools = render_text_description(self.tools)
+        self.prompt = PromptTemplate.from_template(template).partial(
+            tools=rendered_tools,
+            tool_names=", ".join(t.name for t in self.tools)
+        )
         
         # Create agent
         self.agent = create_react_agent(
             llm=self.llm,
             tools=self.tools,
-            prompt=self.prompt
+            prompt=self.prompt,
+            tools_renderer=lambda tools: rendered_tools
         )
         
         # Create executor
@@ -355,6 +383,56 @@ Thought: {agent_scratchpad}"""
             handle_parsing_errors=True
         )
     
+    async def extract_tickers(self, query: str) -> List[str]:
+        """
+        Extract the ticker symbols mentioned in a query with a single one-shot LLM call.
+        
+        Args:
+            query: Natural language query
+            
+        Returns:
+            List of normalized ticker symbols, empty if none were found or extraction failed
+        """
+        # Skip the LLM round-trip for queries that cannot mention more than one ticker
+        if len(find_tickers(query)) < 2:
+            return []
+        
+        try:
+            response = await self.llm.ainvoke(TICKER_EXTRACTION_PROMPT.format(query=query))
+            tickers = json.loads(CODE_FENCE_PATTERN.sub("", response.content))
+        except Exception as e:
+            logger.warning(f"Ticker extraction failed for query '{query}': {e}")
+            return []
+        
+        if not isinstance(tickers, list):
+            return []
+        return list(dict.fromkeys(clean_ticker(t) for t in tickers if isinstance(t, str) and t.strip()))
+    
+    async def compare_tickers(self, query: str, tickers: List[str]) -> Dict[str, Any]:
+        """
+        Answer a multi-ticker query with one parallel fan-out and a single summarization call,
+        bypassing the sequential ReAct loop.
+        
+        Args:
+            query: Natural language query
+            tickers: Ticker symbols to compare
+            
+        Returns:
+            Dict containing analysis results and response
+        """
+        comparison = await peter_lynch_compare_tickers.ainvoke(", ".join(tickers))
+        response = await self.llm.ainvoke(
+            COMPARISON_PROMPT.format(query=query, results=json.dumps(comparison, default=str))
+        )
+        
+        return {
+            "query": query,
+            "response": response.content,
+            "intermediate_steps": [],
+            "success": True,
+            "timestamp": datetime.now().isoformat()
+        }
+    
     async def analyze(self, query: str, chat_history: List = None) -> Dict[str, Any]:
         """
         Process a natural language financial analysis query.
@@ -370,6 +448,11 @@ Thought: {agent_scratchpad}"""
             if chat_history is None:
                 chat_history = []
             
+            # Multi-ticker comparisons short-circuit the ReAct loop
+            tickers = await self.extract_tickers(query)
+            if len(tickers) > 1:
+                return await self.compare_tickers(query, tickers)
+            
             # Run the agent
             result = await self.executor.ainvoke({
                 "input": query
@@ -392,26 +475,29 @@ Thought: {agent_scratchpad}"""
                 "timestamp": datetime.now().isoformat()
             }
 
-# Lazy initialization to avoid module-level errors
-_financial_agent = None
-
-def get_financial_agent():
-    """Get or create the financial agent singleton."""
-    global _financial_agent
-    if _financial_agent is None:
-        _financial_agent = FinancialAnalysisAgent()
-    return _financial_agent
-
-async def process_financial_query(query: str, chat_history: List = None) -> Dict[str, Any]:
+# Lazy initialization to avoid module-level errors; one agent per model
+@lru_cache(maxsize=8)
+def get_financial_agent(model_name: str = "gpt-4o", model_provider: str = "openai") -> FinancialAnalysisAgent:
+    """Get or create the financial agent for a model and provider."""
+    return FinancialAnalysisAgent(model_name, model_provider)
+
+async def process_financial_query(
+    query: str,
+    chat_history: List = None,
+    model_name: str = "gpt-4o",
+    model_provider: str = "openai"
+) -> Dict[str, Any]:
     """
     Process a natural language financial analysis query using the LangChain agent.
     
     Args:
         query: Natural language query
         chat_history: Previous conversation messages
+        model_name: LLM to run the agent with
+        model_provider: Provider of the LLM
         
     Returns:
         Dict containing analysis results and response
     """
-    agent = get_financial_agent()
+    agent = get_financial_agent(model_name, model_provider)
     return await agent.analyze(query, chat_history) 
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+Ticker-symbol matching shared by the chat agents.
+"""
+
+import re
+from typing import List
+
+# Upper-case words in a query that look like tickers but are finance or common acronyms
+NOT_TICKERS = frozenset({
+    "AI", "CEO", "CFO", "COO", "DCF", "EPS", "ETF", "EV", "FCF", "GAAP", "GDP", "IPO",
+    "IRR", "NYSE", "OK", "PE", "PEG", "ROA", "ROE", "ROI", "ROIC", "SEC", "TTM", "USA",
+    "US", "YOY"
+})
+TICKER_PATTERN = re.compile(r"\$?\b([A-Z]{1,5}(?:\.[A-Z])?)\b")
+
+def is_ticker_match(match: re.Match) -> bool:
+    """Whether a TICKER_PATTERN match names a ticker; single letters need a leading $."""
+    ticker = match.group(1)
+    return (len(ticker) > 1 or match.group(0).startswith("$")) and ticker not in NOT_TICKERS
+
+def find_tickers(query: str) -> List[str]:
+    """Distinct ticker-like symbols in a query, in order of first mention."""
+    return list(dict.fromkeys(
+        match.group(1) for match in TICKER_PATTERN.finditer(query) if is_ticker_match(match)
+    ))
@@ -2,27 +2,41 @@
 Warren Buffett Chat Agent for Natural Language Financial Analysis
 """
 import os
-from typing import Dict, Any, List, AsyncGenerator, Optional
-from datetime import datetime, timedelta
-import json
+import re
+import sys
+from typing import Dict, Any, List, AsyncGenerator, Callable
+from datetime import datetime
+import time
 import asyncio
 import logging
-import requests
+import threading
+from concurrent.futures import Future
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import lru_cache, partial
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+import orjson
+
+# Logging is configured by the application; this module only emits records
 logger = logging.getLogger(__name__)
 
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain.tools import tool
-from langchain_core.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.agents.format_scratchpad import format_log_to_str
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer(__name__)
+except ImportError:
+    # Tracing is optional; spans are recorded only where the OpenTelemetry API is
+    # installed and the application has configured an exporter
+    _tracer = None
+
+from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain.agents.output_parsers import ReActSingleInputOutputParser
-from langchain.callbacks.base import BaseCallbackHandler
-from langchain.callbacks.manager import CallbackManager
-from langchain_core.outputs import LLMResult
-from langchain.schema import AgentAction, AgentFinish
+from langchain_core.agents import AgentFinish
+from langchain_core.exceptions import OutputParserException
+from langchain.tools import tool
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.tools import render_text_description
 
 # Import Warren Buffett analysis functions
 from src.agents.warren_buffett import (
@@ -39,18 +53,274 @@ from src.tools.api import (
     get_financial_metrics,
     get_market_cap,
     search_line_items,
-    get_prices
+    aget_prices
 )
 
 # Import existing LLM infrastructure
 from src.llm.models import get_model
+from app.backend.services.tickers import TICKER_PATTERN, find_tickers, is_ticker_match
 
+@lru_cache(maxsize=1024)
 def clean_ticker(ticker: str) -> str:
     """Clean and normalize ticker symbol."""
-    return ticker.strip().strip("'\"").upper()
+    # Interned so every lookup for a ticker shares one string in downstream caches
+    return sys.intern(ticker.strip().strip("'\"").upper())
 
-@tool
-def warren_buffett_fundamentals_analysis(ticker: str) -> Dict[str, Any]:
+@lru_cache(maxsize=1)
+def _format_timestamp(epoch_second: int) -> str:
+    """Format a whole-second Unix timestamp as an ISO-8601 string."""
+    return datetime.fromtimestamp(epoch_second).isoformat()
+
+def _event_timestamp() -> str:
+    """ISO timestamp for events and tool results, formatted at most once per second."""
+    return _format_timestamp(int(time.time()))
+
+def _span(name: str, **attributes):
+    """Tracing span around a tool, API fetch or agent run; a no-op without OpenTelemetry."""
+    return nullcontext() if _tracer is None else _tracer.start_as_current_span(name, attributes=attributes)
+
+def _dumps(event: Dict[str, Any]) -> bytes:
+    """Serialize a streaming event to UTF-8 encoded JSON."""
+    # Tool outputs can carry numpy scalars/arrays from the analysis functions and
+    # arbitrary objects (e.g. pydantic models); render the latter with str()
+    return orjson.dumps(event, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+
+# Seconds without agent events before a heartbeat is sent to keep the connection open
+HEARTBEAT_INTERVAL = float(os.getenv("WARREN_BUFFETT_HEARTBEAT_INTERVAL", "5"))
+
+# Drive tools through the model's native function calling instead of the text ReAct
+# protocol; needs a model with tool-calling support
+USE_TOOL_CALLING = os.getenv("WARREN_BUFFETT_TOOL_CALLING", "0") == "1"
+
+# Streamed LLM tokens are sent in batches of up to this many, or once the oldest
+# buffered token has waited TOKEN_FLUSH_INTERVAL seconds
+TOKEN_BATCH_SIZE = int(os.getenv("WARREN_BUFFETT_TOKEN_BATCH_SIZE", "16"))
+TOKEN_FLUSH_INTERVAL = float(os.getenv("WARREN_BUFFETT_TOKEN_FLUSH_INTERVAL", "0.05"))
+
+# Agent events buffered ahead of a slow SSE client; once full the agent's event
+# stream waits for the client to catch up
+EVENT_QUEUE_SIZE = int(os.getenv("WARREN_BUFFETT_EVENT_QUEUE_SIZE", "256"))
+
+# Wall-clock cap (seconds) on one agent run, on top of the iteration limit
+MAX_EXECUTION_TIME = float(os.getenv("WARREN_BUFFETT_MAX_EXECUTION_TIME", "120"))
+
+# Agent runs allowed at once per agent instance; further queries wait their turn
+MAX_CONCURRENT_ANALYSES = int(os.getenv("WARREN_BUFFETT_MAX_CONCURRENCY", "8"))
+
+# Offer the agent each Buffett analysis as its own tool next to the full analysis
+EXPOSE_GRANULAR_TOOLS = os.getenv("WARREN_BUFFETT_EXPOSE_GRANULAR_TOOLS", "0") == "1"
+
+# Heartbeats differ only in their timestamp, so they are filled into a fixed frame
+_HEARTBEAT_TEMPLATE = b'{"type":"heartbeat","data":{"message":"Processing..."},"timestamp":"%s"}'
+
+# First line of the agent's reasoning after "Thought:" in a ReAct completion
+_THOUGHT_RE = re.compile(r"Thought:([^\n]*)")
+
+# JSON-encoded names for the closed set of agent event types
+_EVENT_TYPE_JSON = {
+    event_type: orjson.dumps(event_type)
+    for event_type in (
+        "agent_action",
+        "agent_finish",
+        "tool_start",
+        "tool_end",
+        "llm_thinking",
+        "llm_token",
+        "llm_thought",
+    )
+}
+
+class _RequestFetches:
+    """API results fetched while answering one query, shared by all of its tool calls."""
+    
+    def __init__(self):
+        # Every tool call in the query analyzes as of the same day, so fetch keys
+        # stay stable even if the query runs across midnight
+        self.end_date = datetime.now().strftime("%Y-%m-%d")
+        self._lock = threading.Lock()
+        self._futures: Dict[tuple, Future] = {}
+    
+    def get(self, key: tuple, fetch):
+        # Tools can run concurrently on worker threads, so the first caller for a
+        # key fetches and the others wait on its future instead of fetching again
+        with self._lock:
+            future = self._futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._futures[key] = Future()
+        if is_owner:
+            try:
+                future.set_result(fetch())
+            except BaseException as e:
+                # Callers already waiting share the failure; later ones fetch again
+                with self._lock:
+                    if self._futures.get(key) is future:
+                        del self._futures[key]
+                future.set_exception(e)
+        return future.result()
+
+_request_fetches: ContextVar[_RequestFetches | None] = ContextVar("buffett_request_fetches", default=None)
+
+class _SharedFetchCache:
+    """API results shared across queries until they expire."""
+    
+    def __init__(self, maxsize: int = 512):
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, tuple] = {}
+        self._maxsize = maxsize
+    
+    def get(self, key: tuple, fetch, ttl: float):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        
+        # Failures propagate uncached so the next query retries the API
+        value = fetch()
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self._maxsize:
+                # Entries are kept in insertion order; drop the oldest
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + ttl, value)
+        return value
+
+# Keys include the analysis date, so fundamentals never outlive their day;
+# market caps move with the price and are refreshed more often
+_FUNDAMENTALS_CACHE_TTL = 24 * 60 * 60
+_MARKET_CAP_CACHE_TTL = 5 * 60
+_CACHE_DISABLED = os.getenv("WARREN_BUFFETT_CACHE_DISABLE", "0") == "1"
+_shared_fetches = _SharedFetchCache()
+
+# Union of the line items the analyses need; fetched once per query and sliced per tool
+_BUFFETT_LINE_ITEMS = [
+    "net_income", "revenue", "earnings_per_share", "depreciation_and_amortization",
+    "capital_expenditure", "outstanding_shares", "issuance_or_purchase_of_equity_shares",
+    "dividends_and_other_cash_distributions"
+]
+_BUFFETT_LINE_ITEMS_LIMIT = 10
+
+def _analysis_end_date() -> str:
+    """End date for the current query's analyses; today outside a query."""
+    fetches = _request_fetches.get()
+    return datetime.now().strftime("%Y-%m-%d") if fetches is None else fetches.end_date
+
+def _traced_fetch(key: tuple, fetch):
+    kind, ticker, end_date = key
+    with _span(f"api.{kind}", ticker=ticker, end_date=end_date):
+        return fetch()
+
+def _memoized(key: tuple, fetch, ttl: float):
+    """Run fetch once per query for key, reusing results from recent queries."""
+    # Spans cover actual API calls only; memo and cache hits return without one
+    fetch = partial(_traced_fetch, key, fetch)
+    if not _CACHE_DISABLED:
+        fetch = partial(_shared_fetches.get, key, fetch, ttl)
+    fetches = _request_fetches.get()
+    return fetch() if fetches is None else fetches.get(key, fetch)
+
+def _fetch_metrics(ticker: str, end_date: str) -> list:
+    return _memoized(
+        ("metrics", ticker, end_date),
+        lambda: get_financial_metrics(ticker, end_date, period="annual", limit=5),
+        _FUNDAMENTALS_CACHE_TTL
+    )
+
+def _fetch_line_items(ticker: str, end_date: str, limit: int) -> list:
+    line_items = _memoized(
+        ("line_items", ticker, end_date),
+        lambda: search_line_items(
+            ticker, _BUFFETT_LINE_ITEMS, end_date, period="annual", limit=_BUFFETT_LINE_ITEMS_LIMIT
+        ),
+        _FUNDAMENTALS_CACHE_TTL
+    )
+    return line_items[:limit]
+
+def _fetch_line_items_all(ticker: str, end_date: str) -> list:
+    return _fetch_line_items(ticker, end_date, _BUFFETT_LINE_ITEMS_LIMIT)
+
+def _fetch_market_cap(ticker: str, end_date: str) -> float | None:
+    return _memoized(
+        ("market_cap", ticker, end_date),
+        lambda: get_market_cap(ticker, end_date),
+        _MARKET_CAP_CACHE_TTL
+    )
+
+_MAX_PREFETCH_TICKERS = 2
+PREFETCH_ENABLED = os.getenv("WARREN_BUFFETT_PREFETCH", "1") == "1"
+
+# Running prefetches; the loop only keeps weak references to tasks
+_prefetch_tasks = set()
+
+def _prefetch_quietly(fetch, ticker: str, end_date: str):
+    try:
+        fetch(ticker, end_date)
+    except Exception:
+        # The tool that needs the data fetches again and reports the error
+        pass
+
+def _prefetch_query_tickers(query: str):
+    """
+    Start fetching data for tickers named in the query into the query's memo.
+    
+    Runs while the LLM is still deciding on its first action; when it then calls
+    a Buffett tool for the ticker, the fetch is already in flight or done.
+    """
+    if not PREFETCH_ENABLED:
+        return
+    tickers = find_tickers(query)
+    
+    end_date = _analysis_end_date()
+    for ticker in tickers[:_MAX_PREFETCH_TICKERS]:
+        ticker = clean_ticker(ticker)
+        for fetch in (_fetch_metrics, _fetch_line_items_all, _fetch_market_cap):
+            # to_thread carries the current context, and with it the query's memo
+            task = asyncio.ensure_future(asyncio.to_thread(_prefetch_quietly, fetch, ticker, end_date))
+            _prefetch_tasks.add(task)
+            task.add_done_callback(_prefetch_tasks.discard)
+
+def buffett_tool(analysis_type: str, error_result: Dict[str, Any] | None = None):
+    """
+    Turn a single-ticker Buffett analysis function into a LangChain tool.
+    
+    The decorated function receives the cleaned ticker and the query's end date and
+    returns the analysis result; ticker cleaning, the response envelope and error
+    handling are shared by every tool. error_result replaces the default score-0
+    result when the analysis fails.
+    """
+    def decorator(analyze: Callable[[str, str], Dict[str, Any]]):
+        def run(ticker: str) -> Dict[str, Any]:
+            try:
+                ticker = clean_ticker(ticker)
+                with _span(f"tool.{analysis_type}", ticker=ticker):
+                    result = analyze(ticker, _analysis_end_date())
+                
+                return {
+                    "ticker": ticker,
+                    "analysis_type": analysis_type,
+                    "result": result,
+                    "timestamp": _event_timestamp()
+                }
+                
+            except Exception as e:
+                logger.error(f"❌ TOOL ERROR: {analyze.__name__} failed for {ticker}: {str(e)}")
+                return {
+                    "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
+                    "analysis_type": analysis_type,
+                    "error": str(e),
+                    "result": {**(error_result or {"score": 0}), "details": f"Error: {str(e)}"},
+                    "timestamp": _event_timestamp()
+                }
+        
+        # The tool takes its name and description from these; the signature
+        # (ticker only) is taken from run itself
+        run.__name__ = analyze.__name__
+        run.__doc__ = analyze.__doc__
+        return tool(run)
+    return decorator
+
+@buffett_tool("warren_buffett_fundamentals")
+def warren_buffett_fundamentals_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze a stock's fundamental health using Warren Buffett's criteria.
     Evaluates ROE, debt levels, operating margins, and liquidity position.
@@ -61,35 +331,10 @@ def warren_buffett_fundamentals_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing fundamentals analysis with score, details, and key metrics
     """
-    try:
-        logger.info(f"🔧 TOOL CALL: warren_buffett_fundamentals_analysis for ticker: {ticker}")
-        ticker = clean_ticker(ticker)
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
-        result = analyze_fundamentals(metrics)
-        
-        logger.info(f"✅ TOOL RESULT: Fundamentals analysis for {ticker} completed with score: {result.get('score', 'N/A')}")
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_fundamentals",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ TOOL ERROR: warren_buffett_fundamentals_analysis failed for {ticker}: {str(e)}")
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_fundamentals",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    return analyze_fundamentals(_fetch_metrics(ticker, end_date))
 
-@tool
-def warren_buffett_moat_analysis(ticker: str) -> Dict[str, Any]:
+@buffett_tool("warren_buffett_moat")
+def warren_buffett_moat_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze a company's competitive moat using Buffett's approach.
     Looks for durable competitive advantages through stable ROE and margins.
@@ -100,31 +345,10 @@ def warren_buffett_moat_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing moat analysis with score, details, and competitive advantage assessment
     """
-    try:
-        ticker = clean_ticker(ticker)
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
-        result = analyze_moat(metrics)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_moat",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_moat",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    return analyze_moat(_fetch_metrics(ticker, end_date))
 
-@tool
-def warren_buffett_consistency_analysis(ticker: str) -> Dict[str, Any]:
+@buffett_tool("warren_buffett_consistency")
+def warren_buffett_consistency_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze earnings consistency and growth using Buffett's criteria.
     Evaluates earnings stability and growth trends over multiple periods.
@@ -135,38 +359,10 @@ def warren_buffett_consistency_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing consistency analysis with score, details, and earnings trends
     """
-    try:
-        ticker = clean_ticker(ticker)
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        financial_line_items = search_line_items(
-            ticker,
-            ["net_income", "revenue", "earnings_per_share"],
-            end_date,
-            period="annual",
-            limit=10
-        )
-        
-        result = analyze_consistency(financial_line_items)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_consistency",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_consistency",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    return analyze_consistency(_fetch_line_items(ticker, end_date, limit=10))
 
-@tool
-def warren_buffett_management_analysis(ticker: str) -> Dict[str, Any]:
+@buffett_tool("warren_buffett_management")
+def warren_buffett_management_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Analyze management quality using Buffett's shareholder-oriented criteria.
     Evaluates share buybacks, dividends, and capital allocation decisions.
@@ -177,42 +373,10 @@ def warren_buffett_management_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing management analysis with score, details, and shareholder focus assessment
     """
-    try:
-        ticker = clean_ticker(ticker)
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "issuance_or_purchase_of_equity_shares",
-                "dividends_and_other_cash_distributions",
-                "outstanding_shares"
-            ],
-            end_date,
-            period="annual",
-            limit=5
-        )
-        
-        result = analyze_management_quality(financial_line_items)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_management",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_management",
-            "error": str(e),
-            "result": {"score": 0, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    return analyze_management_quality(_fetch_line_items(ticker, end_date, limit=5))
 
-@tool
-def warren_buffett_intrinsic_value_analysis(ticker: str) -> Dict[str, Any]:
+@buffett_tool("warren_buffett_intrinsic_value", error_result={"intrinsic_value": None})
+def warren_buffett_intrinsic_value_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Calculate intrinsic value using Buffett's DCF approach with owner earnings.
     Provides margin of safety calculation and valuation assessment.
@@ -223,49 +387,20 @@ def warren_buffett_intrinsic_value_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing intrinsic value analysis with valuation, margin of safety, and investment recommendation
     """
-    try:
-        ticker = clean_ticker(ticker)
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "net_income", "depreciation_and_amortization", "capital_expenditure",
-                "outstanding_shares", "revenue"
-            ],
-            end_date,
-            period="annual",
-            limit=5
-        )
-        
-        market_cap = get_market_cap(ticker, end_date)
-        result = calculate_intrinsic_value(financial_line_items)
-        
-        # Add margin of safety calculation
-        margin_of_safety = None
-        if result.get("intrinsic_value") and market_cap:
-            margin_of_safety = (result["intrinsic_value"] - market_cap) / market_cap
-            result["margin_of_safety"] = margin_of_safety
-            result["market_cap"] = market_cap
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_intrinsic_value",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_intrinsic_value",
-            "error": str(e),
-            "result": {"intrinsic_value": None, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+    financial_line_items = _fetch_line_items(ticker, end_date, limit=5)
+    
+    market_cap = _fetch_market_cap(ticker, end_date)
+    result = calculate_intrinsic_value(financial_line_items)
+    
+    # Add margin of safety calculation
+    if result.get("intrinsic_value") and market_cap:
+        result["margin_of_safety"] = (result["intrinsic_value"] - market_cap) / market_cap
+        result["market_cap"] = market_cap
+    
+    return result
 
-@tool
-def warren_buffett_owner_earnings_analysis(ticker: str) -> Dict[str, Any]:
+@buffett_tool("warren_buffett_owner_earnings", error_result={"owner_earnings": None})
+def warren_buffett_owner_earnings_analysis(ticker: str, end_date: str) -> Dict[str, Any]:
     """
     Calculate owner earnings using Buffett's preferred earnings measure.
     Owner Earnings = Net Income + Depreciation - Maintenance CapEx
@@ -276,38 +411,104 @@ def warren_buffett_owner_earnings_analysis(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict containing owner earnings analysis with components and true earnings power assessment
     """
+    return calculate_owner_earnings(_fetch_line_items(ticker, end_date, limit=5))
+
+# The per-dimension analyses, in the order they appear in a full review
+_BUFFETT_ANALYSIS_TOOLS = (
+    warren_buffett_fundamentals_analysis,
+    warren_buffett_moat_analysis,
+    warren_buffett_consistency_analysis,
+    warren_buffett_management_analysis,
+    warren_buffett_intrinsic_value_analysis,
+    warren_buffett_owner_earnings_analysis,
+)
+
+async def _full_analysis(ticker: str) -> Dict[str, Any]:
+    """Run all six Buffett analyses for one ticker concurrently, in the caller's memo."""
+    # The six analyses need just three distinct fetches. Issue them together
+    # first so no analysis waits on one fetch before starting the next (the
+    # intrinsic value needs both line items and market cap); a failed fetch is
+    # retried once by the analyses that need the data.
+    end_date = _analysis_end_date()
+    await asyncio.gather(
+        asyncio.to_thread(_fetch_metrics, ticker, end_date),
+        asyncio.to_thread(_fetch_line_items_all, ticker, end_date),
+        asyncio.to_thread(_fetch_market_cap, ticker, end_date),
+        return_exceptions=True
+    )
+    
+    # The analyses are blocking calls that catch their own errors; run them on
+    # worker threads concurrently
+    results = await asyncio.gather(*(
+        asyncio.to_thread(analysis.func, ticker) for analysis in _BUFFETT_ANALYSIS_TOOLS
+    ))
+    return {
+        "ticker": ticker,
+        "analysis_type": "warren_buffett_full",
+        "results": {result["analysis_type"]: result["result"] for result in results},
+        "errors": {result["analysis_type"]: result["error"] for result in results if "error" in result},
+        "timestamp": _event_timestamp()
+    }
+
+@tool
+async def warren_buffett_full_analysis(ticker: str) -> Dict[str, Any]:
+    """
+    Run every Warren Buffett analysis for a stock at once: fundamentals, moat,
+    earnings consistency, management quality, intrinsic value and owner earnings.
+    Prefer this over calling the individual analyses one by one when a complete
+    Buffett-style review of a company is needed.
+    
+    Args:
+        ticker: Stock ticker symbol (e.g., TSLA, AAPL)
+    
+    Returns:
+        Dict containing each analysis result keyed by its analysis type
+    """
+    ticker = clean_ticker(ticker)
+    logger.info(f"🔧 TOOL CALL: warren_buffett_full_analysis for ticker: {ticker}")
+    
+    # Outside an agent query the analyses still need a memo to share fetches through
+    fetches_token = _request_fetches.set(_RequestFetches()) if _request_fetches.get() is None else None
     try:
-        ticker = clean_ticker(ticker)
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        financial_line_items = search_line_items(
-            ticker,
-            ["net_income", "depreciation_and_amortization", "capital_expenditure"],
-            end_date,
-            period="annual",
-            limit=5
-        )
-        
-        result = calculate_owner_earnings(financial_line_items)
-        
-        return {
-            "ticker": ticker,
-            "analysis_type": "warren_buffett_owner_earnings",
-            "result": result,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "ticker": clean_ticker(ticker) if ticker else "UNKNOWN",
-            "analysis_type": "warren_buffett_owner_earnings",
-            "error": str(e),
-            "result": {"owner_earnings": None, "details": f"Error: {str(e)}"},
-            "timestamp": datetime.now().isoformat()
-        }
+        with _span("tool.warren_buffett_full", ticker=ticker):
+            return await _full_analysis(ticker)
+    finally:
+        if fetches_token is not None:
+            _request_fetches.reset(fetches_token)
 
 @tool
-def get_stock_quote(ticker: str) -> Dict[str, Any]:
+async def warren_buffett_compare_tickers(tickers: str) -> Dict[str, Any]:
+    """
+    Run every Warren Buffett analysis for several stocks at once, to compare them.
+    Use this instead of calling warren_buffett_full_analysis once per stock.
+    
+    Args:
+        tickers: Comma-separated ticker symbols (e.g., AAPL, MSFT, NVDA)
+    
+    Returns:
+        Dict mapping each ticker to its full Buffett analysis
+    """
+    symbols = list(dict.fromkeys(clean_ticker(t) for t in tickers.split(",") if t.strip()))
+    logger.info(f"🔧 TOOL CALL: warren_buffett_compare_tickers for tickers: {symbols}")
+    
+    fetches_token = _request_fetches.set(_RequestFetches()) if _request_fetches.get() is None else None
+    try:
+        # Fan out the per-ticker reviews instead of running them one ReAct turn at a time
+        with _span("tool.warren_buffett_comparison", tickers=symbols):
+            results = await asyncio.gather(*[_full_analysis(t) for t in symbols])
+    finally:
+        if fetches_token is not None:
+            _request_fetches.reset(fetches_token)
+    
+    return {
+        "tickers": symbols,
+        "analysis_type": "warren_buffett_comparison",
+        "results": dict(zip(symbols, results)),
+        "timestamp": _event_timestamp()
+    }
+
+@tool
+async def get_stock_quote(ticker: str) -> Dict[str, Any]:
     """
     Fetch the latest stock quote (price, change, market-cap, etc.) for a ticker symbol.
 
@@ -317,160 +518,211 @@ def get_stock_quote(ticker: str) -> Dict[str, Any]:
     """
     try:
         ticker_clean = clean_ticker(ticker)
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        try:
-            from src.tools.api import get_prices  # local helper that already handles caching & auth
+        today = _analysis_end_date()
 
-            prices = get_prices(ticker_clean, today, today)
-            if not prices:
-                raise ValueError("No price data returned for today")
+        # Awaited on the event loop over a pooled connection instead of taking a
+        # worker thread for the blocking request; caching & auth are handled there
+        with _span("tool.get_stock_quote", ticker=ticker_clean):
+            prices = await aget_prices(ticker_clean, today, today)
+        if not prices:
+            raise ValueError("No price data returned for today")
 
-            p = prices[0]
+        p = prices[0]
 
-            return {
-                "ticker": ticker_clean,
-                "price": p.close,
-                "open": p.open,
-                "high": p.high,
-                "low": p.low,
-                "volume": p.volume,
-                "timestamp": p.time,
-            }
-        except Exception as e:
-            raise e
+        return {
+            "ticker": ticker_clean,
+            "price": p.close,
+            "open": p.open,
+            "high": p.high,
+            "low": p.low,
+            "volume": p.volume,
+            "timestamp": p.time,
+        }
     except Exception as e:
         logger.error(f"get_stock_quote tool error for {ticker}: {e}")
         return {
             "ticker": ticker,
             "error": str(e),
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _event_timestamp(),
         }
 
-class StreamingCallbackHandler(BaseCallbackHandler):
-    """Custom callback handler to stream agent decisions and actions."""
+# "price of AAPL", "what's the current stock price for $MSFT?", "AAPL quote" ...
+# The wording is case-insensitive but the symbol must be upper-case, so "price of it"
+# or "gold price" never reach the quote tool.
+_QUOTE_QUERY_RE = re.compile(
+    r"^\s*(?i:(?:what(?:'s| is)\s+)?(?:the\s+)?(?:current\s+|latest\s+)?(?:stock\s+|share\s+)?"
+    r"(?:price|quote)\s+(?:of|for)\s+)(\$?[A-Z]{1,5}(?:\.[A-Z])?)\s*\??\s*$"
+    r"|^\s*(\$?[A-Z]{1,5}(?:\.[A-Z])?)\s+(?i:(?:stock\s+|share\s+)?(?:price|quote))\s*\??\s*$"
+)
+
+async def _quote_response(query: str) -> str | None:
+    """
+    Answer a bare stock-price question straight from get_stock_quote.
     
-    def __init__(self, queue: asyncio.Queue, loop: Optional[asyncio.AbstractEventLoop] = None):
-        self.queue = queue
-        self.current_step = 0
-        self.loop = loop
-        
-    def _send_event_sync(self, event_type: str, data: Dict[str, Any]):
-        """Send an event to the streaming queue (thread-safe)."""
-        event = {
-            "type": event_type,
-            "data": data,
-            "timestamp": datetime.now().isoformat(),
-            "step": self.current_step
+    Such questions need one data lookup and no analysis, so running the ReAct
+    loop would only add LLM round-trips. Returns None for any other query, or
+    when the quote can't be fetched, so the agent handles it as usual.
+    """
+    match = _QUOTE_QUERY_RE.match(query)
+    if not match:
+        return None
+    symbol = TICKER_PATTERN.fullmatch(match.group(1) or match.group(2))
+    if not is_ticker_match(symbol):
+        return None
+    quote = await get_stock_quote.ainvoke({"ticker": symbol.group(1)})
+    if "error" in quote:
+        return None
+    return (
+        f"## Latest Quote: **{quote['ticker']}**\n\n"
+        f"| Metric | Value |\n"
+        f"|--------|-------|\n"
+        f"| Close | ${quote['price']:,.2f} |\n"
+        f"| Open | ${quote['open']:,.2f} |\n"
+        f"| High | ${quote['high']:,.2f} |\n"
+        f"| Low | ${quote['low']:,.2f} |\n"
+        f"| Volume | {quote['volume']:,} |\n\n"
+        f"*As of {quote['timestamp']}*"
+    )
+
+# Tools offered to the agent, built once for every agent instance
+_BUFFETT_TOOLS = (
+    warren_buffett_full_analysis,
+    warren_buffett_compare_tickers,
+    *(_BUFFETT_ANALYSIS_TOOLS if EXPOSE_GRANULAR_TOOLS else ()),
+    get_stock_quote,
+)
+
+# Progress messages per tool: (tool_start message, tool_end details)
+_TOOL_MESSAGES = {
+    "warren_buffett_fundamentals_analysis": ("⚡ Checking ROE, debt, margins and liquidity...", "Scoring financial strength..."),
+    "warren_buffett_moat_analysis": ("⚡ Assessing the competitive moat...", "Weighing return and margin stability..."),
+    "warren_buffett_consistency_analysis": ("⚡ Reviewing earnings consistency...", "Evaluating earnings growth and stability..."),
+    "warren_buffett_management_analysis": ("⚡ Evaluating management and capital allocation...", "Reviewing buybacks and dividends..."),
+    "warren_buffett_intrinsic_value_analysis": ("⚡ Estimating intrinsic value...", "Comparing intrinsic value with market cap..."),
+    "warren_buffett_owner_earnings_analysis": ("⚡ Calculating owner earnings...", "Assessing cash-generating ability..."),
+    "warren_buffett_full_analysis": ("⚡ Running the full Buffett review in parallel...", "Combining all six analyses..."),
+    "warren_buffett_compare_tickers": ("⚖️ Reviewing every company side by side...", "Lining up the analyses for comparison..."),
+    "get_stock_quote": ("⚡ Fetching the latest stock quote...", "Reading the latest price..."),
+}
+_DEFAULT_TOOL_MESSAGES = ("⚡ Running analysis...", "Processing financial metrics...")
+
+# Queued after the last agent event
+_STREAM_DONE = object()
+
+async def _pump_events(stream, events: asyncio.Queue):
+    """Move agent events into a queue, ending with _STREAM_DONE or the run's error."""
+    try:
+        async for event in stream:
+            await events.put(event)
+    except Exception as e:
+        await events.put(e)
+    else:
+        await events.put(_STREAM_DONE)
+
+def _output_preview(output: Any, limit: int = 200) -> str:
+    """Short text preview of a tool result for progress events."""
+    # Tools return dicts; serialize them with orjson instead of building the much
+    # longer Python repr, and decode only enough bytes (at most 4 per character)
+    # to know whether the text runs past the limit
+    text = output if isinstance(output, str) else _dumps(output)[:4 * limit + 4].decode(errors="ignore")
+    return text[:limit] + "..." if len(text) > limit else text
+
+def _token_event(tokens: List[str], step: int) -> bytes:
+    """Serialize buffered LLM tokens as one llm_token event and empty the buffer."""
+    event = _event_json("llm_token", {"content": "".join(tokens)}, step)
+    tokens.clear()
+    return event
+
+def _event_json(event_type: str, data: Dict[str, Any], step: int) -> bytes:
+    """Serialize a streaming event with its type, timestamp and agent step."""
+    # The envelope always has the same shape, so splice it together around the
+    # serialized payload instead of building and dumping a wrapper dict
+    return (
+        b'{"type":' + (_EVENT_TYPE_JSON.get(event_type) or orjson.dumps(event_type))
+        + b',"data":' + _dumps(data)
+        + b',"timestamp":"' + _event_timestamp().encode()
+        + b'","step":' + str(step).encode() + b'}'
+    )
+
+# The ReAct prompt's "Thought: Do I need to use a tool? Yes/No" line
+_TOOL_DECISION_RE = re.compile(r"^\s*(?:Thought:\s*)?Do I need to use a tool\?\s*(Yes|No)?", re.IGNORECASE)
+
+class _BuffettOutputParser(ReActSingleInputOutputParser):
+    """ReAct parser that accepts a plain answer without the Final Answer marker."""
+    
+    def parse(self, text: str):
+        try:
+            return super().parse(text)
+        except OutputParserException:
+            # A malformed tool call or an empty reply still goes back to the LLM
+            if "Action:" in text or not text.strip():
+                raise
+            answer = text.strip()
+            first_line, _, rest = answer.partition("\n")
+            decision = _TOOL_DECISION_RE.match(first_line)
+            if decision:
+                # The model often writes its markdown answer straight after the
+                # "Do I need to use a tool? No" line; take it as the final answer
+                # instead of paying for another LLM turn to restate it. After a
+                # "Yes" (or no answer) the rest is reasoning, not an answer.
+                if (decision.group(1) or "").lower() != "no" or not rest.strip():
+                    raise
+                answer = rest.strip()
+            elif answer.startswith("Thought:"):
+                # A thought cut off before its action is reasoning, not an answer
+                raise
+            return AgentFinish({"output": answer}, text)
+
+def _compact_result(result: Any) -> Any:
+    """Analysis result without its nested metric dumps (metrics, components, ...)."""
+    if not isinstance(result, dict):
+        return result
+    return {key: value for key, value in result.items() if not isinstance(value, dict)}
+
+def _compact_observation(observation: Any) -> Any:
+    """Tool result reduced to scores and findings for earlier scratchpad steps."""
+    if not isinstance(observation, dict):
+        return observation
+    compact = {key: value for key, value in observation.items() if key != "timestamp"}
+    if compact.get("analysis_type") == "warren_buffett_comparison":
+        compact["results"] = {
+            ticker: _compact_observation(result)
+            for ticker, result in compact["results"].items()
         }
-        
-        # If we have a loop, schedule the coroutine
-        if self.loop and not self.loop.is_closed():
-            try:
-                asyncio.run_coroutine_threadsafe(
-                    self.queue.put(json.dumps(event)), 
-                    self.loop
-                )
-            except Exception as e:
-                # Fallback: just print for debugging
-                print(f"📊 {event_type}: {data.get('message', data)}")
-        else:
-            # Fallback: just print for debugging  
-            print(f"📊 {event_type}: {data.get('message', data)}")
-    
-    def on_agent_action(self, action: AgentAction, **kwargs) -> Any:
-        """Called when agent decides to take an action."""
-        self._send_event_sync("agent_action", {
-            "tool": action.tool,
-            "tool_input": action.tool_input,
-            "log": action.log,
-            "message": f"🔧 Using tool: {action.tool}",
-            "details": f"Analyzing {action.tool_input} with {action.tool}"
-        })
-        
-    def on_agent_finish(self, finish: AgentFinish, **kwargs) -> Any:
-        """Called when agent finishes."""
-        self._send_event_sync("agent_finish", {
-            "output": finish.return_values.get("output", ""),
-            "message": "✅ Analysis complete",
-            "log": finish.log
-        })
-    
-    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs) -> Any:
-        """Called when a tool starts."""
-        tool_name = serialized.get("name", "Unknown tool")
-        self._send_event_sync("tool_start", {
-            "tool_name": tool_name,
-            "input": input_str,
-            "message": f"⚡ Running {tool_name} analysis...",
-            "details": f"Fetching data for: {input_str}"
-        })
-    
-    def on_tool_end(self, output: str, **kwargs) -> Any:
-        """Called when a tool ends."""
-        self._send_event_sync("tool_end", {
-            "output": output[:200] + "..." if len(output) > 200 else output,
-            "message": "📊 Analysis data received",
-            "details": "Processing financial metrics..."
-        })
-    
-    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs) -> Any:
-        """Called when LLM starts thinking."""
-        self.current_step += 1
-        self._send_event_sync("llm_thinking", {
-            "message": "🤔 Warren Buffett is thinking...",
-            "details": "Analyzing the data and formulating response",
-            "step": self.current_step
-        })
-    
-    def on_llm_end(self, response: LLMResult, **kwargs) -> Any:
-        """Called when LLM finishes thinking."""
-        if response.generations and response.generations[0]:
-            content = response.generations[0][0].text
-            # Extract the thought process
-            if "Thought:" in content:
-                thought = content.split("Thought:")[1].split("\n")[0].strip()
-                self._send_event_sync("llm_thought", {
-                    "thought": thought,
-                    "message": f"💭 Thought: {thought}",
-                    "details": "Deciding next action..."
-                })
-    
-    def on_text(self, text: str, **kwargs) -> Any:
-        """Called when agent produces text."""
-        if "Thought:" in text:
-            thought = text.split("Thought:")[1].split("\n")[0].strip()
-            self._send_event_sync("agent_thinking", {
-                "thought": thought,
-                "message": f"💭 {thought}",
-                "details": "Processing analysis logic..."
-            })
+    elif "results" in compact:
+        compact["results"] = {
+            analysis_type: _compact_result(result)
+            for analysis_type, result in compact["results"].items()
+        }
+    if "result" in compact:
+        compact["result"] = _compact_result(compact["result"])
+    return compact
 
-class WarrenBuffettChatAgent:
-    """Warren Buffett specialized chat agent for value investing analysis."""
+def _format_scratchpad(intermediate_steps: List) -> str:
+    """
+    Build the ReAct scratchpad like format_log_to_str, but with every observation
+    except the latest compacted.
     
-    def __init__(self, model_name: str = "gpt-4o", model_provider: str = "openai"):
-        self.model_name = model_name
-        self.model_provider = model_provider
-        
-        # Initialize LLM using existing infrastructure
-        self.llm = get_model(model_name, model_provider)
-        if self.llm is None:
-            raise ValueError(f"Failed to initialize model: {model_name} with provider: {model_provider}")
-        
-        # Use the tools defined in this module
-        self.tools = [
-            warren_buffett_fundamentals_analysis,
-            warren_buffett_moat_analysis,
-            warren_buffett_consistency_analysis,
-            warren_buffett_management_analysis,
-            warren_buffett_intrinsic_value_analysis,
-            warren_buffett_owner_earnings_analysis,
-            get_stock_quote,
-        ]
-        
-        # Create prompt (reuse existing one)
-        template = """You are Warren Buffett, the legendary value investor and chairman of Berkshire Hathaway. You are known for your long-term investment philosophy, focus on intrinsic value, and ability to identify companies with strong competitive moats.
+    The scratchpad is replayed on every LLM turn, so the raw metric dumps of
+    earlier tool calls would be paid for again on each later step; the agent has
+    already reasoned over them in full when they were the latest observation.
+    Tool results are rendered as JSON rather than Python reprs.
+    """
+    thoughts = ""
+    last = len(intermediate_steps) - 1
+    for i, (action, observation) in enumerate(intermediate_steps):
+        if i < last:
+            observation = _compact_observation(observation)
+        if not isinstance(observation, str):
+            # Compact JSON from orjson: shorter than the dict's Python repr, and
+            # much faster to build for payloads with hundreds of floats
+            observation = _dumps(observation).decode()
+        thoughts += action.log
+        thoughts += f"\nObservation: {observation}\nThought: "
+    return thoughts
+
+# Persona and formatting rules shared by both agent styles
+_BUFFETT_PERSONA = """You are Warren Buffett, the legendary value investor and chairman of Berkshire Hathaway. You are known for your long-term investment philosophy, focus on intrinsic value, and ability to identify companies with strong competitive moats.
 
 Your investment philosophy includes:
 - Focus on businesses you can understand
@@ -514,7 +766,12 @@ Present key numbers in a table when possible:
 - **Confidence**: X%
 - **Reasoning**: Provide clear explanation
 
-Use proper Markdown headings (##, ###), **bold**, *italics*, bullet points (-), and tables (|) to structure your analysis clearly and professionally.
+Use proper Markdown headings (##, ###), **bold**, *italics*, bullet points (-), and tables (|) to structure your analysis clearly and professionally."""
+
+# Persona, formatting rules and ReAct tool instructions: identical on every LLM call
+# of an agent, so they form a static prefix that providers can cache. Parsed once at
+# import and shared by every agent instance.
+_BUFFETT_SYSTEM_PROMPT = PromptTemplate.from_template(_BUFFETT_PERSONA + """
 
 TOOLS:
 ------
@@ -538,28 +795,104 @@ Thought: Do I need to use a tool? No
 Final Answer: [your response here]
 ```
 
-Begin!
+Begin!""")
 
-Question: {input}
+# The per-call part: the user's question and the agent's progress so far
+_BUFFETT_QUESTION_TEMPLATE = """Question: {input}
 Thought: {agent_scratchpad}"""
 
-        self.prompt = PromptTemplate.from_template(template)
-        
-        # Create non-streaming agent for regular use
-        self.agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=self.prompt
+@lru_cache(maxsize=2)
+def _buffett_prompt(mark_cacheable: bool) -> ChatPromptTemplate:
+    """
+    Chat prompt for the agent style in use, built once per process.
+    
+    mark_cacheable flags the system message for Anthropic's prompt caching.
+    """
+    if USE_TOOL_CALLING:
+        # Tools are passed to the model as schemas, so only the persona is prompted
+        system_prompt = _BUFFETT_PERSONA
+    else:
+        # Tools are fixed for the process's lifetime, so the system prompt is rendered
+        # once; each ReAct step then only substitutes {input} and {agent_scratchpad}
+        system_prompt = _BUFFETT_SYSTEM_PROMPT.format(
+            tools=render_text_description(list(_BUFFETT_TOOLS)),
+            tool_names=", ".join(t.name for t in _BUFFETT_TOOLS)
         )
+    if mark_cacheable:
+        # Anthropic only caches prefixes that are explicitly marked; OpenAI and
+        # others cache a repeated leading prefix automatically
+        system_message = SystemMessage(content=[{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }])
+    else:
+        system_message = SystemMessage(content=system_prompt)
+    
+    if USE_TOOL_CALLING:
+        return ChatPromptTemplate.from_messages([
+            system_message,
+            ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad")
+        ])
+    return ChatPromptTemplate.from_messages([
+        system_message,
+        ("human", _BUFFETT_QUESTION_TEMPLATE)
+    ])
+
+class WarrenBuffettChatAgent:
+    """Warren Buffett specialized chat agent for value investing analysis."""
+    
+    def __init__(self, model_name: str = "gpt-4o", model_provider: str = "openai"):
+        self.model_name = model_name
+        self.model_provider = model_provider
+        
+        # Initialize LLM using existing infrastructure
+        self.llm = get_model(model_name, model_provider)
+        if self.llm is None:
+            raise ValueError(f"Failed to initialize model: {model_name} with provider: {model_provider}")
+        
+        # Use the tools defined in this module. The full analysis covers every
+        # dimension in one ReAct step; the per-dimension tools are opt-in since each
+        # one the agent calls costs another LLM turn over the growing scratchpad.
+        self.tools = list(_BUFFETT_TOOLS)
+        
+        # Prompts depend only on the module's tools and flags, so agents for
+        # different models share them
+        self.prompt = _buffett_prompt(model_provider.lower() == "anthropic")
+        
+        if USE_TOOL_CALLING:
+            # The model requests tools through its native function-calling API: no
+            # Thought/Action text to generate or parse, and a reply without tool
+            # calls ends the run directly
+            self.agent = create_tool_calling_agent(self.llm, self.tools, self.prompt)
+        else:
+            # Create the agent used for both regular and streaming analysis. This is the
+            # chain create_react_agent builds, with the compacting scratchpad formatter.
+            self.agent = (
+                RunnablePassthrough.assign(
+                    agent_scratchpad=lambda x: _format_scratchpad(x["intermediate_steps"])
+                )
+                | self.prompt
+                | self.llm.bind(stop=["\nObservation"])
+                | _BuffettOutputParser()
+            )
         
         self.executor = AgentExecutor(
             agent=self.agent,
             tools=self.tools,
             verbose=True,
             return_intermediate_steps=True,
-            max_iterations=8,
+            # The full analysis tool covers every dimension in one step; walking
+            # through the per-dimension tools needs the original budget
+            max_iterations=8 if EXPOSE_GRANULAR_TOOLS else 5,
+            max_execution_time=MAX_EXECUTION_TIME,
             handle_parsing_errors=True
         )
+        
+        # Caps concurrent agent runs on this (shared) instance so bursts of queries
+        # queue here instead of tripping the LLM provider's rate limits
+        self._concurrency = asyncio.Semaphore(MAX_CONCURRENT_ANALYSES)
     
     async def analyze(self, query: str, chat_history: List = None) -> Dict[str, Any]:
         """
@@ -576,12 +909,31 @@ Thought: {agent_scratchpad}"""
             logger.info(f"🎯 ANALYZE REQUEST: Received query: '{query}'")
             logger.info(f"📋 CHAT HISTORY: {len(chat_history or [])} previous messages")
             
-            # Execute the agent
+            quote_response = await _quote_response(query)
+            if quote_response is not None:
+                logger.info(f"⚡ QUICK QUOTE: Answered without running the agent")
+                return {
+                    "response": quote_response,
+                    "intermediate_steps": [],
+                    "success": True,
+                    "timestamp": _event_timestamp(),
+                    "agent": "warren_buffett"
+                }
+            
+            # Execute the agent; its tool calls share one set of API fetches
             logger.info(f"🚀 AGENT EXECUTION: Starting Warren Buffett agent analysis...")
-            result = await self.executor.ainvoke({
-                "input": query,
-                "chat_history": chat_history or []
-            })
+            fetches_token = _request_fetches.set(_RequestFetches())
+            try:
+                async with self._concurrency:
+                    # Prefetch only once admitted, so queued queries don't hit the API
+                    _prefetch_query_tickers(query)
+                    with _span("agent.warren_buffett", model=self.model_name, provider=self.model_provider):
+                        result = await self.executor.ainvoke({
+                            "input": query,
+                            "chat_history": chat_history or []
+                        })
+            finally:
+                _request_fetches.reset(fetches_token)
             
             logger.info(f"✅ AGENT COMPLETE: Analysis finished successfully")
             logger.info(f"📝 RESPONSE LENGTH: {len(result.get('output', ''))}")
@@ -592,7 +944,7 @@ Thought: {agent_scratchpad}"""
                 "response": result["output"],
                 "intermediate_steps": result.get("intermediate_steps", []),
                 "success": True,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _event_timestamp(),
                 "agent": "warren_buffett"
             }
             
@@ -603,11 +955,11 @@ Thought: {agent_scratchpad}"""
                 "response": f"I apologize, but I encountered an error while analyzing your question: {str(e)}",
                 "error": str(e),
                 "success": False,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _event_timestamp(),
                 "agent": "warren_buffett"
             }
         
-    async def analyze_streaming(self, query: str, chat_history: List = None) -> AsyncGenerator[str, None]:
+    async def analyze_streaming(self, query: str, chat_history: List = None) -> AsyncGenerator[bytes, None]:
         """
         Stream the analysis process in real-time.
         
@@ -616,115 +968,235 @@ Thought: {agent_scratchpad}"""
             chat_history: Previous conversation messages
             
         Yields:
-            JSON strings containing streaming events
+            UTF-8 encoded JSON streaming events
         """
-        # Create streaming queue
-        stream_queue = asyncio.Queue()
-        
-        # Get current event loop
-        current_loop = asyncio.get_running_loop()
-        
-        # Create callback handler
-        callback_handler = StreamingCallbackHandler(stream_queue, current_loop)
-        callback_manager = CallbackManager([callback_handler])
-        
-        # Create agent with streaming callbacks
-        agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=self.prompt
-        )
-        
-        executor = AgentExecutor(
-            agent=agent,
-            tools=self.tools,
-            verbose=True,
-            return_intermediate_steps=True,
-            max_iterations=8,
-            handle_parsing_errors=True,
-            callbacks=callback_manager
-        )
-        
-        # Start the analysis in background
-        analysis_task = asyncio.create_task(
-            executor.ainvoke({
-                "input": query,
-                "chat_history": chat_history or []
-            })
-        )
-        
-        # Send initial event
-        initial_event = {
-            "type": "start",
-            "data": {
-                "message": "🎯 Starting Warren Buffett analysis...",
-                "query": query,
-                "agent": "warren_buffett"
-            },
-            "timestamp": datetime.now().isoformat()
-        }
-        yield json.dumps(initial_event)
-        
-        # Stream events until analysis is complete
-        while not analysis_task.done():
-            try:
-                # Wait for streaming events or timeout
-                event_json = await asyncio.wait_for(stream_queue.get(), timeout=1.0)
-                yield event_json
-            except asyncio.TimeoutError:
-                # Send heartbeat to keep connection alive
-                heartbeat = {
-                    "type": "heartbeat",
-                    "data": {"message": "Processing..."},
-                    "timestamp": datetime.now().isoformat()
-                }
-                yield json.dumps(heartbeat)
-        
-        # Get final result
-        try:
-            result = await analysis_task
-            final_event = {
+        quote_response = await _quote_response(query)
+        if quote_response is not None:
+            # Bare price questions are answered without running the agent
+            yield _dumps({
                 "type": "complete",
                 "data": {
-                    "response": result["output"],
+                    "response": quote_response,
                     "success": True,
                     "agent": "warren_buffett"
                 },
-                "timestamp": datetime.now().isoformat()
-            }
-            yield json.dumps(final_event)
-        except Exception as e:
-            error_event = {
-                "type": "error",
+                "timestamp": _event_timestamp()
+            })
+            return
+        
+        # Queries beyond the concurrency limit wait here before the agent starts
+        # or prefetches anything
+        await self._concurrency.acquire()
+        pump = None
+        try:
+            # LangChain's own event stream reports LLM tokens, tool runs and the final
+            # output as they happen; no callback handler or cross-thread queue needed.
+            # Run types the loop below never looks at are dropped at the source.
+            stream = self.executor.astream_events(
+                {
+                    "input": query,
+                    "chat_history": chat_history or []
+                },
+                version="v2",
+                exclude_types=["prompt", "parser", "retriever"]
+            )
+            events = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+            
+            # Tool calls for this query share one set of API fetches. The prefetch and
+            # pump tasks copy the context when created, so the memo is reset right after;
+            # later steps of this generator may run in another task's context, where a
+            # reset in the finally below would fail.
+            fetches_token = _request_fetches.set(_RequestFetches())
+            try:
+                _prefetch_query_tickers(query)
+                pump = asyncio.ensure_future(_pump_events(stream, events))
+            finally:
+                _request_fetches.reset(fetches_token)
+            
+            # Send initial event
+            initial_event = {
+                "type": "start",
                 "data": {
-                    "error": str(e),
-                    "success": False,
+                    "message": "🎯 Starting Warren Buffett analysis...",
+                    "query": query,
                     "agent": "warren_buffett"
                 },
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _event_timestamp()
             }
-            yield json.dumps(error_event)
+            yield _dumps(initial_event)
+            
+            try:
+                step = 0
+                result = None
+                # LLM tokens not yet sent, and when the first of them arrived
+                tokens = []
+                tokens_since = 0.0
+                while True:
+                    # Bursts of events (LLM tokens) are already queued and taken
+                    # without waiting; the timeout only fires while the agent is
+                    # silent (e.g. waiting on an API call) or buffered tokens are due
+                    try:
+                        event = events.get_nowait()
+                    except asyncio.QueueEmpty:
+                        timeout = max(0.0, tokens_since + TOKEN_FLUSH_INTERVAL - time.monotonic()) if tokens else HEARTBEAT_INTERVAL
+                        try:
+                            event = await asyncio.wait_for(events.get(), timeout)
+                        except asyncio.TimeoutError:
+                            if tokens:
+                                yield _token_event(tokens, step)
+                            else:
+                                # Send heartbeat to keep connection alive
+                                yield _HEARTBEAT_TEMPLATE % _event_timestamp().encode()
+                            continue
+                    
+                    if event is not _STREAM_DONE and not isinstance(event, BaseException) and event["event"] == "on_chat_model_stream":
+                        content = event["data"]["chunk"].content
+                        if isinstance(content, str):
+                            # Tokens are sent in batches; one event per token would
+                            # cost a serialization and a frame for every few characters
+                            if content:
+                                if not tokens:
+                                    tokens_since = time.monotonic()
+                                tokens.append(content)
+                                if len(tokens) >= TOKEN_BATCH_SIZE:
+                                    yield _token_event(tokens, step)
+                            continue
+                    
+                    # Buffered tokens go out before anything that follows them
+                    if tokens:
+                        yield _token_event(tokens, step)
+                    if event is _STREAM_DONE:
+                        break
+                    if isinstance(event, BaseException):
+                        raise event
+                    
+                    kind = event["event"]
+                    data = event["data"]
+                    if kind == "on_chat_model_stream":
+                        # Content blocks rather than text; passed through as they are
+                        content = data["chunk"].content
+                        if content:
+                            yield _event_json("llm_token", {"content": content}, step)
+                    elif kind == "on_chat_model_start":
+                        step += 1
+                        yield _event_json("llm_thinking", {
+                            "message": "🤔 Warren Buffett is thinking...",
+                            "details": "Analyzing the data and formulating response",
+                            "step": step
+                        }, step)
+                    elif kind == "on_chat_model_end":
+                        content = data["output"].content
+                        # Extract the thought process; the substring check skips the
+                        # regex for completions without one (e.g. the final answer)
+                        thought_match = "Thought:" in content and _THOUGHT_RE.search(content)
+                        if thought_match:
+                            thought = thought_match.group(1).strip()
+                            yield _event_json("llm_thought", {
+                                "thought": thought,
+                                "message": f"💭 Thought: {thought}",
+                                "details": "Deciding next action..."
+                            }, step)
+                    elif kind == "on_tool_start":
+                        tool_name = event["name"]
+                        tool_input = data.get("input")
+                        yield _event_json("agent_action", {
+                            "tool": tool_name,
+                            "tool_input": tool_input,
+                            "message": f"🔧 Using tool: {tool_name}",
+                            "details": f"Analyzing {tool_input} with {tool_name}"
+                        }, step)
+                        yield _event_json("tool_start", {
+                            "tool_name": tool_name,
+                            "input": tool_input,
+                            "message": _TOOL_MESSAGES.get(tool_name, _DEFAULT_TOOL_MESSAGES)[0],
+                            "details": f"Fetching data for: {tool_input}"
+                        }, step)
+                    elif kind == "on_tool_end":
+                        tool_name = event["name"]
+                        yield _event_json("tool_end", {
+                            "tool_name": tool_name,
+                            "output": _output_preview(data.get("output", "")),
+                            "message": "📊 Analysis data received",
+                            "details": _TOOL_MESSAGES.get(tool_name, _DEFAULT_TOOL_MESSAGES)[1]
+                        }, step)
+                    elif kind == "on_chain_end" and not event["parent_ids"]:
+                        # The executor's own run finished: this is the final answer
+                        result = data["output"]
+                        yield _event_json("agent_finish", {
+                            "output": result.get("output", ""),
+                            "message": "✅ Analysis complete"
+                        }, step)
+                
+                final_event = {
+                    "type": "complete",
+                    "data": {
+                        "response": result["output"],
+                        "success": True,
+                        "agent": "warren_buffett"
+                    },
+                    "timestamp": _event_timestamp()
+                }
+                yield _dumps(final_event)
+            except Exception as e:
+                error_event = {
+                    "type": "error",
+                    "data": {
+                        "error": str(e),
+                        "success": False,
+                        "agent": "warren_buffett"
+                    },
+                    "timestamp": _event_timestamp()
+                }
+                yield _dumps(error_event)
+        finally:
+            # Client disconnected before the analysis finished; stop the agent run.
+            # The slot is released even if setting up the run failed.
+            if pump is not None:
+                pump.cancel()
+            self._concurrency.release()
+
+# Agent instances with lazy initialization; one agent per model
+_warren_buffett_agents: Dict[tuple, WarrenBuffettChatAgent] = {}
+_warren_buffett_agent_lock = threading.Lock()
 
-# Global agent instance with lazy initialization
-_warren_buffett_agent = None
+def get_warren_buffett_agent(model_name: str = "gpt-4o", model_provider: str = "openai") -> WarrenBuffettChatAgent:
+    """Get or create the Warren Buffett chat agent for a model and provider."""
+    key = (model_name, model_provider)
+    agent = _warren_buffett_agents.get(key)
+    if agent is None:
+        # The agent may be built by the startup warm-up thread and a request at once
+        with _warren_buffett_agent_lock:
+            agent = _warren_buffett_agents.get(key)
+            if agent is None:
+                agent = _warren_buffett_agents[key] = WarrenBuffettChatAgent(model_name, model_provider)
+    return agent
 
-def get_warren_buffett_agent():
-    """Get or create the Warren Buffett chat agent instance."""
-    global _warren_buffett_agent
-    if _warren_buffett_agent is None:
-        _warren_buffett_agent = WarrenBuffettChatAgent()
-    return _warren_buffett_agent
+async def warm_up_warren_buffett_agent():
+    """Build the default agent off the event loop so the first query doesn't pay for it."""
+    try:
+        await asyncio.to_thread(get_warren_buffett_agent)
+        logger.info("🔥 WARM-UP: Warren Buffett agent initialized")
+    except Exception as e:
+        # A missing API key etc. surfaces again on the first real request
+        logger.warning(f"⚠️ WARM-UP: Warren Buffett agent initialization failed: {str(e)}")
 
-async def process_warren_buffett_query(query: str, chat_history: List = None) -> Dict[str, Any]:
+async def process_warren_buffett_query(
+    query: str,
+    chat_history: List = None,
+    model_name: str = "gpt-4o",
+    model_provider: str = "openai"
+) -> Dict[str, Any]:
     """
     Process a natural language query using Warren Buffett's investment approach.
     
     Args:
         query: Natural language query about stocks or investing
         chat_history: Previous conversation messages
+        model_name: LLM to run the agent with
+        model_provider: Provider of the LLM
         
     Returns:
         Dict containing Warren Buffett's analysis and response
     """
-    agent = get_warren_buffett_agent()
-    return await agent.analyze(query, chat_history) 
\ No newline at end of file
+    agent = get_warren_buffett_agent(model_name, model_provider)
+    return await agent.analyze(query, chat_history) 
@@ -0,0 +1,52 @@
+"""
+Server-Sent Events parsing shared by the streaming test scripts.
+"""
+
+def _parse_frame(frame: bytes) -> tuple[bytes | None, bytes | None]:
+    """Split one SSE frame into its event name and data payload."""
+    event_type = None
+    data_lines = []
+    for line in frame.split(b"\n"):
+        if line.startswith(b"data:"):
+            data_lines.append(line[5:].strip())
+        elif line.startswith(b"event:"):
+            event_type = line[6:].strip()
+    return event_type, b"\n".join(data_lines) if data_lines else None
+
+def _split_frames(buffer: bytearray) -> list[tuple[bytes | None, bytes | None]]:
+    """Parse the complete frames at the start of buffer and remove them from it."""
+    events = []
+    start = 0
+    while (end := buffer.find(b"\n\n", start)) != -1:
+        if end > start:
+            events.append(_parse_frame(bytes(buffer[start:end])))
+        start = end + 2
+    del buffer[:start]
+    return events
+
+def iter_sse_events(response, chunk_size: int = 8192):
+    """
+    Yield (event_type, data) for each event in a streaming requests response.
+
+    Both values are raw bytes (None when the frame has no such field); the stream
+    is read in chunks and split on blank lines, so nothing is decoded until the
+    caller needs it. orjson.loads accepts the data bytes directly.
+    """
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buffer += chunk
+        yield from _split_frames(buffer)
+
+    if buffer.strip():
+        yield _parse_frame(bytes(buffer))
+
+async def aiter_sse_events(response):
+    """Async counterpart of iter_sse_events for a streaming httpx response."""
+    buffer = bytearray()
+    async for chunk in response.aiter_bytes():
+        buffer += chunk
+        for event in _split_frames(buffer):
+            yield event
+
+    if buffer.strip():
+        yield _parse_frame(bytes(buffer))
@@ -3,23 +3,44 @@
 Simple test script to verify the AI Hedge Fund API is working correctly.
 Run this after starting the API server with: python app/backend/run_api.py
 """
-import requests
+import asyncio
+import httpx
 import json
 import time
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+
+try:
+    import uvloop
+except ImportError:
+    # Optional (and unavailable on Windows); the default asyncio loop works too
+    uvloop = None
 
 # Configuration
 BASE_URL = "http://localhost:8000"
 TEST_TIMEOUT = 30  # seconds
 
-def test_api():
+async def test_api():
     """Run basic API tests."""
     print("🚀 Testing AI Hedge Fund API...\n")
     
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=TEST_TIMEOUT) as client:
+        # The three probes are independent; send them together and report in order
+        health, agents_response, models_response = await asyncio.gather(
+            client.get("/health", timeout=5),
+            client.get("/hedge-fund/agents"),
+            client.get("/hedge-fund/models"),
+            return_exceptions=True
+        )
+        await _report_and_run(client, health, agents_response, models_response)
+
+async def _report_and_run(client: httpx.AsyncClient, health, agents_response, models_response):
+    """Report the probe results, then run the analysis if the API is up."""
     # Test 1: Health Check
     print("1️⃣ Testing Health Check...")
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        if isinstance(health, Exception):
+            raise health
+        response = health
         if response.status_code == 200:
             print("✅ Health check passed:", response.json())
         else:
@@ -34,7 +55,10 @@ def test_api():
     
     # Test 2: Get Available Agents
     print("\n2️⃣ Getting Available Agents...")
-    response = requests.get(f"{BASE_URL}/hedge-fund/agents")
+    if isinstance(agents_response, Exception):
+        print("❌ Failed to get agents:", agents_response)
+        return
+    response = agents_response
     if response.status_code == 200:
         agents = response.json()["agents"]
         print(f"✅ Found {len(agents)} available agents:")
@@ -48,7 +72,10 @@ def test_api():
     
     # Test 3: Get Available Models
     print("\n3️⃣ Getting Available Models...")
-    response = requests.get(f"{BASE_URL}/hedge-fund/models")
+    if isinstance(models_response, Exception):
+        print("❌ Failed to get models:", models_response)
+        return
+    response = models_response
     if response.status_code == 200:
         models = response.json()["models"]
         print(f"✅ Found {len(models)} available models:")
@@ -65,7 +92,7 @@ def test_api():
     print("   (This may take 10-30 seconds depending on the model...)")
     
     # Prepare request
-    end_date = datetime.now()
+    end_date = date.today()
     start_date = end_date - timedelta(days=30)  # Last 30 days
     
     payload = {
@@ -75,8 +102,8 @@ def test_api():
         "model_provider": "OPENAI",
         "initial_cash": 50000,
         "margin_requirement": 0,
-        "start_date": start_date.strftime("%Y-%m-%d"),
-        "end_date": end_date.strftime("%Y-%m-%d")
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat()
     }
     
     print(f"\n   Request payload:")
@@ -87,11 +114,7 @@ def test_api():
     
     try:
         start_time = time.time()
-        response = requests.post(
-            f"{BASE_URL}/hedge-fund/run-sync",
-            json=payload,
-            timeout=TEST_TIMEOUT
-        )
+        response = await client.post("/hedge-fund/run-sync", json=payload)
         elapsed_time = time.time() - start_time
         
         if response.status_code == 200:
@@ -120,7 +143,7 @@ def test_api():
             print(f"\n❌ Analysis failed with status {response.status_code}")
             print(f"   Error: {response.text}")
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print(f"\n⏱️ Request timed out after {TEST_TIMEOUT} seconds")
         print("   Try using fewer tickers/agents or a faster model")
     except Exception as e:
@@ -133,4 +156,6 @@ def test_api():
     print("   3. Read the full documentation: app/backend/API_DOCUMENTATION.md")
 
 if __name__ == "__main__":
-    test_api() 
\ No newline at end of file
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(test_api()) 
\ No newline at end of file
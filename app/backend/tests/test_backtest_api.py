@@ -3,20 +3,98 @@
 Test script for the backtesting API endpoints.
 Shows how to start a backtest and stream real-time updates.
 """
+import asyncio
+import httpx
 import requests
 import json
+import logging
+import orjson
 import time
 import os
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:
+    # Optional (and unavailable on Windows); the default asyncio loop works too
+    uvloop = None
+
+from sse_utils import aiter_sse_events, iter_sse_events
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 load_dotenv(dotenv_path="../../.env")
 
+# One keep-alive connection pool shared by every request this script makes
+session = requests.Session()
+
 def get_api_key():
     """Get API key from environment variables."""
     return os.getenv("API_KEY") or os.getenv("HEDGE_FUND_API_KEY")
 
+def _print_backtest_event(data: dict, prefix: str = "") -> bool:
+    """Print one backtest stream event; returns True once the backtest is complete."""
+    event_type = data.get("type", "unknown")
+    
+    if event_type == "backtest_start":
+        print(f"{prefix}   ✅ Backtest started - {data.get('total_days', 0)} trading days")
+        print(f"{prefix}   📈 Tickers: {', '.join(data.get('tickers', []))}")
+    
+    elif event_type == "backtest_progress":
+        progress = data.get("progress", 0) * 100
+        current_date = data.get("current_date", "")
+        completed = data.get("completed_days", 0)
+        total = data.get("total_days", 0)
+        print(f"{prefix}   📊 Progress: {progress:.1f}% ({completed}/{total}) - {current_date}")
+    
+    elif event_type == "trading":
+        ticker = data.get("ticker", "")
+        action = data.get("action", "").upper()
+        quantity = data.get("quantity", 0)
+        price = data.get("price", 0)
+        portfolio_value = data.get("portfolio_value", 0)
+        print(f"{prefix}   💰 Trade: {action} {quantity} {ticker} @ ${price:.2f}")
+        print(f"{prefix}       Portfolio Value: ${portfolio_value:,.2f}")
+    
+    elif event_type == "portfolio_update":
+        day = data.get("date", "")
+        total_value = data.get("total_value", 0)
+        daily_return = data.get("daily_return")
+        return_str = f"{daily_return*100:+.2f}%" if daily_return else "N/A"
+        print(f"{prefix}   📈 Portfolio [{day}]: ${total_value:,.2f} (daily: {return_str})")
+    
+    elif event_type == "performance_update":
+        total_return = data.get("total_return", 0)
+        sharpe = data.get("sharpe_ratio")
+        max_dd = data.get("max_drawdown")
+        print(f"{prefix}   📊 Performance Update:")
+        print(f"{prefix}       Total Return: {total_return:+.2f}%")
+        if sharpe: print(f"{prefix}       Sharpe Ratio: {sharpe:.2f}")
+        if max_dd: print(f"{prefix}       Max Drawdown: {max_dd:.2f}%")
+    
+    elif event_type == "backtest_complete":
+        print(f"{prefix}   🎯 Backtest Complete!")
+        final_perf = data.get("final_performance", {})
+        print(f"{prefix}   💰 Final Results:")
+        print(f"{prefix}       Total Return: {final_perf.get('total_return', 0):+.2f}%")
+        print(f"{prefix}       Final Value: ${final_perf.get('final_value', 0):,.2f}")
+        print(f"{prefix}       Initial Capital: ${final_perf.get('initial_capital', 0):,.2f}")
+        if final_perf.get('sharpe_ratio'): 
+            print(f"{prefix}       Sharpe Ratio: {final_perf.get('sharpe_ratio'):.2f}")
+        if final_perf.get('max_drawdown'): 
+            print(f"{prefix}       Max Drawdown: {final_perf.get('max_drawdown'):.2f}%")
+        return True
+    
+    elif event_type == "keepalive":
+        pass  # Skip keepalive messages
+    
+    else:
+        print(f"{prefix}   📄 {event_type}: {data}")
+    
+    return False
+
 def test_backtest_streaming():
     """Test the streaming backtest endpoint."""
     print("🚀 Testing AI Hedge Fund Backtesting API...\n")
@@ -35,15 +113,15 @@ def test_backtest_streaming():
         print("⚠️ No API key found - running in development mode")
     
     # Calculate 2-week timeframe for faster testing
-    end_date = datetime.now()
+    end_date = date.today()
     start_date = end_date - timedelta(weeks=2)
     
     # Payload for backtest
     payload = {
         "tickers": ["AAPL", "MSFT"],
         "selected_agents": ["michael_burry", "cathie_wood"],
-        "start_date": start_date.strftime("%Y-%m-%d"),
-        "end_date": end_date.strftime("%Y-%m-%d"),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
         "model_name": "gpt-4o-mini",
         "model_provider": "OpenAI",
         "initial_capital": 100000,
@@ -51,17 +129,19 @@ def test_backtest_streaming():
         "show_reasoning": True
     }
     
-    print(f"📤 Backtest Request: {json.dumps(payload, indent=2)}")
+    # The full payload is only serialized when debug output is on (LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📤 Backtest Request: %s", json.dumps(payload, indent=2))
     print(f"🔗 Base URL: {base_url}\n")
     
     try:
         # Step 1: Start the backtest
         print("🔹 Step 1: Starting backtest...")
-        start_response = requests.post(
+        start_response = session.post(
             f"{base_url}/backtest/start",
             json=payload,
             headers=headers,
-            timeout=30
+            timeout=(5, 30)
         )
         
         if start_response.status_code != 200:
@@ -86,11 +166,13 @@ def test_backtest_streaming():
             "Accept": "text/event-stream"
         }
         
-        with requests.get(
+        with session.get(
             f"{base_url}/backtest/stream/{backtest_id}",
             headers=stream_headers,
             stream=True,
-            timeout=300  # 5 minute timeout
+            # Fail fast on connect; the read limit applies per chunk, so a long
+            # backtest that keeps sending events is never cut off
+            timeout=(5, 300)
         ) as response:
             
             if response.status_code != 200:
@@ -100,84 +182,25 @@ def test_backtest_streaming():
             
             event_count = 0
             
-            for line in response.iter_lines(decode_unicode=True):
-                if line:
-                    event_count += 1
-                    
-                    # Parse SSE format
-                    if line.startswith("event:"):
-                        event_type = line.split(":", 1)[1].strip()
-                        print(f"🔸 Event {event_count}: {event_type}")
-                    
-                    elif line.startswith("data:"):
-                        data_str = line.split(":", 1)[1].strip()
-                        try:
-                            data = json.loads(data_str)
-                            
-                            event_type = data.get("type", "unknown")
-                            
-                            if event_type == "backtest_start":
-                                print(f"   ✅ Backtest started - {data.get('total_days', 0)} trading days")
-                                print(f"   📈 Tickers: {', '.join(data.get('tickers', []))}")
-                                
-                            elif event_type == "backtest_progress":
-                                progress = data.get("progress", 0) * 100
-                                current_date = data.get("current_date", "")
-                                completed = data.get("completed_days", 0)
-                                total = data.get("total_days", 0)
-                                print(f"   📊 Progress: {progress:.1f}% ({completed}/{total}) - {current_date}")
-                                
-                            elif event_type == "trading":
-                                ticker = data.get("ticker", "")
-                                action = data.get("action", "").upper()
-                                quantity = data.get("quantity", 0)
-                                price = data.get("price", 0)
-                                portfolio_value = data.get("portfolio_value", 0)
-                                print(f"   💰 Trade: {action} {quantity} {ticker} @ ${price:.2f}")
-                                print(f"       Portfolio Value: ${portfolio_value:,.2f}")
-                                
-                            elif event_type == "portfolio_update":
-                                date = data.get("date", "")
-                                total_value = data.get("total_value", 0)
-                                daily_return = data.get("daily_return")
-                                return_str = f"{daily_return*100:+.2f}%" if daily_return else "N/A"
-                                print(f"   📈 Portfolio [{date}]: ${total_value:,.2f} (daily: {return_str})")
-                                
-                            elif event_type == "performance_update":
-                                total_return = data.get("total_return", 0)
-                                sharpe = data.get("sharpe_ratio")
-                                max_dd = data.get("max_drawdown")
-                                print(f"   📊 Performance Update:")
-                                print(f"       Total Return: {total_return:+.2f}%")
-                                if sharpe: print(f"       Sharpe Ratio: {sharpe:.2f}")
-                                if max_dd: print(f"       Max Drawdown: {max_dd:.2f}%")
-                                
-                            elif event_type == "backtest_complete":
-                                print(f"   🎯 Backtest Complete!")
-                                final_perf = data.get("final_performance", {})
-                                print(f"   💰 Final Results:")
-                                print(f"       Total Return: {final_perf.get('total_return', 0):+.2f}%")
-                                print(f"       Final Value: ${final_perf.get('final_value', 0):,.2f}")
-                                print(f"       Initial Capital: ${final_perf.get('initial_capital', 0):,.2f}")
-                                if final_perf.get('sharpe_ratio'): 
-                                    print(f"       Sharpe Ratio: {final_perf.get('sharpe_ratio'):.2f}")
-                                if final_perf.get('max_drawdown'): 
-                                    print(f"       Max Drawdown: {final_perf.get('max_drawdown'):.2f}%")
-                                break
-                                
-                            elif event_type == "keepalive":
-                                pass  # Skip keepalive messages
-                                
-                            else:
-                                print(f"   📄 {event_type}: {data}")
-                                
-                        except json.JSONDecodeError:
-                            print(f"   📄 Raw data: {data_str}")
-                    
-                    print()  # Empty line for readability
+            for event_type, data_bytes in iter_sse_events(response):
+                event_count += 1
+                
+                if event_type is not None:
+                    print(f"🔸 Event {event_count}: {event_type.decode()}")
+                
+                if data_bytes is not None:
+                    try:
+                        if _print_backtest_event(orjson.loads(data_bytes)):
+                            break
+                    except orjson.JSONDecodeError:
+                        print(f"   📄 Raw data: {data_bytes.decode(errors='replace')}")
+                
+                print()  # Empty line for readability
         
         print(f"✅ Streaming complete! Processed {event_count} events.")
         
+    except requests.exceptions.ConnectTimeout:
+        print("⏱️ Could not connect within 5 seconds")
     except requests.exceptions.Timeout:
         print("⏱️ Request timed out")
     except requests.exceptions.RequestException as e:
@@ -186,6 +209,89 @@ def test_backtest_streaming():
         print("\n🛑 Interrupted by user")
 
 
+# Backtests run side by side by test_backtest_streaming_concurrent
+CONCURRENT_SCENARIOS = [
+    {"tickers": ["AAPL", "MSFT"], "selected_agents": ["michael_burry", "cathie_wood"]},
+    {"tickers": ["NVDA"], "selected_agents": ["warren_buffett"]},
+    {"tickers": ["GOOGL", "AMZN"], "selected_agents": ["technical_analyst"]},
+]
+
+async def _stream_backtest(client: httpx.AsyncClient, payload: dict, headers: dict):
+    """Start one backtest and print its events, each line tagged with its tickers."""
+    prefix = f"[{','.join(payload['tickers'])}]"
+    
+    start_response = await client.post("/backtest/start", json=payload, headers=headers)
+    if start_response.status_code != 200:
+        print(f"{prefix} ❌ Failed to start backtest: {start_response.status_code}")
+        print(f"{prefix} Response: {start_response.text}")
+        return
+    backtest_id = start_response.json()["backtest_id"]
+    print(f"{prefix} ✅ Backtest started: {backtest_id}")
+    
+    event_count = 0
+    async with client.stream(
+        "GET",
+        f"/backtest/stream/{backtest_id}",
+        headers={**headers, "Accept": "text/event-stream"}
+    ) as response:
+        if response.status_code != 200:
+            print(f"{prefix} ❌ Stream error: {response.status_code}")
+            return
+        
+        async for _, data_bytes in aiter_sse_events(response):
+            event_count += 1
+            if data_bytes is None:
+                continue
+            try:
+                if _print_backtest_event(orjson.loads(data_bytes), prefix):
+                    break
+            except orjson.JSONDecodeError:
+                print(f"{prefix}   📄 Raw data: {data_bytes.decode(errors='replace')}")
+    
+    print(f"{prefix} ✅ Streaming complete! Processed {event_count} events.")
+
+async def test_backtest_streaming_concurrent(scenarios: list[dict] = CONCURRENT_SCENARIOS):
+    """Run several streaming backtests at once over one connection pool."""
+    print(f"🚀 Testing {len(scenarios)} concurrent backtest streams...\n")
+    
+    api_key = get_api_key()
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    
+    end_date = date.today()
+    start_date = end_date - timedelta(weeks=2)
+    payloads = [
+        {
+            **scenario,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "model_name": "gpt-4o-mini",
+            "model_provider": "OpenAI",
+            "initial_capital": 100000,
+            "margin_requirement": 0.0,
+            "show_reasoning": True
+        }
+        for scenario in scenarios
+    ]
+    
+    # Streams share one event loop and connection pool; the connect limit fails
+    # fast while the read limit applies per chunk, as in the single-stream test
+    async with httpx.AsyncClient(
+        base_url="http://localhost:8000",
+        timeout=httpx.Timeout(300, connect=5),
+        limits=httpx.Limits(max_connections=32)
+    ) as client:
+        results = await asyncio.gather(
+            *(_stream_backtest(client, payload, headers) for payload in payloads),
+            return_exceptions=True
+        )
+    
+    for payload, result in zip(payloads, results):
+        if isinstance(result, Exception):
+            print(f"[{','.join(payload['tickers'])}] ❌ Request error: {result!r}")
+
+
 def test_backtest_sync():
     """Test the synchronous backtest endpoint."""
     print("🚀 Testing Synchronous Backtest API...\n")
@@ -204,30 +310,32 @@ def test_backtest_sync():
         print("⚠️ No API key found - running in development mode")
     
     # Calculate 1-week timeframe for faster testing
-    end_date = datetime.now()
+    end_date = date.today()
     start_date = end_date - timedelta(weeks=1)
     
     payload = {
         "tickers": ["AAPL"],
         "selected_agents": ["warren_buffett"],
-        "start_date": start_date.strftime("%Y-%m-%d"),
-        "end_date": end_date.strftime("%Y-%m-%d"),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
         "model_name": "gpt-4o-mini",
         "model_provider": "OpenAI",
         "initial_capital": 50000,
         "margin_requirement": 0.0
     }
     
-    print(f"📤 Request: {json.dumps(payload, indent=2)}")
+    # The full payload is only serialized when debug output is on (LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📤 Request: %s", json.dumps(payload, indent=2))
     
     try:
         print("⏳ Running synchronous backtest (this may take a while)...")
         
-        response = requests.post(
+        response = session.post(
             f"{base_url}/backtest/run-sync",
             json=payload,
             headers=headers,
-            timeout=300  # 5 minute timeout
+            timeout=(5, 300)  # 5 second connect, 5 minute response timeout
         )
         
         if response.status_code != 200:
@@ -254,6 +362,8 @@ def test_backtest_sync():
             print(f"   Start: {history[0]['date']} - ${history[0]['value']:,.2f}")
             print(f"   End: {history[-1]['date']} - ${history[-1]['value']:,.2f}")
         
+    except requests.exceptions.ConnectTimeout:
+        print("⏱️ Could not connect within 5 seconds")
     except requests.exceptions.Timeout:
         print("⏱️ Request timed out")
     except requests.exceptions.RequestException as e:
@@ -263,12 +373,19 @@ def test_backtest_sync():
 if __name__ == "__main__":
     import sys
     
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(message)s")
+    
     if len(sys.argv) > 1 and sys.argv[1] == "sync":
         test_backtest_sync()
+    elif len(sys.argv) > 1 and sys.argv[1] == "concurrent":
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        asyncio.run(test_backtest_streaming_concurrent())
     else:
         test_backtest_streaming()
         
     print("\n" + "="*60)
     print("💡 Usage:")
     print("   python test_backtest_api.py        # Test streaming API")
-    print("   python test_backtest_api.py sync   # Test synchronous API") 
\ No newline at end of file
+    print("   python test_backtest_api.py sync   # Test synchronous API")
+    print("   python test_backtest_api.py concurrent  # Stream several backtests at once") 
\ No newline at end of file
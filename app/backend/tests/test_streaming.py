@@ -5,8 +5,15 @@ Shows real-time progress updates as AI agents analyze stocks.
 """
 import requests
 import json
+import logging
+import orjson
+import os
 import time
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+
+from sse_utils import iter_sse_events
+
+logger = logging.getLogger(__name__)
 
 def test_streaming_endpoint():
     """Test the streaming endpoint with Server-Sent Events."""
@@ -19,7 +26,7 @@ def test_streaming_endpoint():
     }
     
     # Calculate 10-day timeframe
-    end_date = datetime.now()
+    end_date = date.today()
     start_date = end_date - timedelta(days=10)
     
     # Payload with 10-day timeframe and multiple agents
@@ -29,18 +36,21 @@ def test_streaming_endpoint():
         "model_name": "gpt-4o-mini",
         "model_provider": "OpenAI",
         "initial_cash": 50000,
-        "start_date": start_date.strftime("%Y-%m-%d"),
-        "end_date": end_date.strftime("%Y-%m-%d"),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
         "show_reasoning": True
     }
     
-    print(f"📤 Request: {json.dumps(payload, indent=2)}")
+    # The full payload is only serialized when debug output is on (LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📤 Request: %s", json.dumps(payload, indent=2))
     print(f"🔗 URL: {url}\n")
     print("📡 Streaming events:\n")
     
     try:
-        # Make the streaming request
-        with requests.post(url, json=payload, headers=headers, stream=True, timeout=120) as response:
+        # Make the streaming request. Connecting must succeed within 5 seconds; after
+        # that the 120-second limit applies to each read, not to the whole stream.
+        with requests.post(url, json=payload, headers=headers, stream=True, timeout=(5, 120)) as response:
             if response.status_code != 200:
                 print(f"❌ Error: {response.status_code}")
                 print(f"Response: {response.text}")
@@ -48,53 +58,51 @@ def test_streaming_endpoint():
             
             # Process streaming events
             event_count = 0
-            for line in response.iter_lines(decode_unicode=True):
-                if line:
-                    event_count += 1
-                    
-                    # Parse SSE format
-                    if line.startswith("event:"):
-                        event_type = line.split(":", 1)[1].strip()
-                        print(f"🔹 Event {event_count}: {event_type}")
-                    
-                    elif line.startswith("data:"):
-                        data_str = line.split(":", 1)[1].strip()
-                        try:
-                            data = json.loads(data_str)
+            for event_type, data_bytes in iter_sse_events(response):
+                event_count += 1
+                
+                if event_type is not None:
+                    print(f"🔹 Event {event_count}: {event_type.decode()}")
+                
+                if data_bytes is not None:
+                    try:
+                        data = orjson.loads(data_bytes)
+                        
+                        # Pretty print based on event type
+                        if data.get("type") == "start":
+                            print("   ✅ Analysis started")
+                            
+                        elif data.get("type") == "progress":
+                            agent = data.get("agent", "Unknown")
+                            ticker = data.get("ticker", "")
+                            status = data.get("status", "")
+                            timestamp = data.get("timestamp", "")
+                            print(f"   📊 {agent} analyzing {ticker}: {status}")
+                            print(f"   ⏰ {timestamp}")
+                            
+                        elif data.get("type") == "complete":
+                            print("   🎯 Analysis complete!")
+                            decisions = data.get("data", {}).get("decisions", {})
+                            for ticker, decision in decisions.items():
+                                action = decision.get("action", "N/A")
+                                quantity = decision.get("quantity", 0)
+                                confidence = decision.get("confidence", 0)
+                                reasoning = decision.get("reasoning", "")
+                                print(f"   📈 {ticker}: {action.upper()} {quantity} shares ({confidence}% confidence)")
+                                print(f"   💭 Reasoning: {reasoning[:100]}...")
+                            
+                        else:
+                            print(f"   📄 Data: {data}")
                             
-                            # Pretty print based on event type
-                            if data.get("type") == "start":
-                                print("   ✅ Analysis started")
-                                
-                            elif data.get("type") == "progress":
-                                agent = data.get("agent", "Unknown")
-                                ticker = data.get("ticker", "")
-                                status = data.get("status", "")
-                                timestamp = data.get("timestamp", "")
-                                print(f"   📊 {agent} analyzing {ticker}: {status}")
-                                print(f"   ⏰ {timestamp}")
-                                
-                            elif data.get("type") == "complete":
-                                print("   🎯 Analysis complete!")
-                                decisions = data.get("data", {}).get("decisions", {})
-                                for ticker, decision in decisions.items():
-                                    action = decision.get("action", "N/A")
-                                    quantity = decision.get("quantity", 0)
-                                    confidence = decision.get("confidence", 0)
-                                    reasoning = decision.get("reasoning", "")
-                                    print(f"   📈 {ticker}: {action.upper()} {quantity} shares ({confidence}% confidence)")
-                                    print(f"   💭 Reasoning: {reasoning[:100]}...")
-                                
-                            else:
-                                print(f"   📄 Data: {data}")
-                                
-                        except json.JSONDecodeError:
-                            print(f"   📄 Raw data: {data_str}")
-                    
-                    print()  # Empty line for readability
-                    
+                    except orjson.JSONDecodeError:
+                        print(f"   📄 Raw data: {data_bytes.decode(errors='replace')}")
+                
+                print()  # Empty line for readability
+                
+    except requests.exceptions.ConnectTimeout:
+        print("⏱️ Could not connect within 5 seconds")
     except requests.exceptions.Timeout:
-        print("⏱️ Request timed out after 120 seconds")
+        print("⏱️ No data received for 120 seconds")
     except requests.exceptions.RequestException as e:
         print(f"❌ Request error: {e}")
     except KeyboardInterrupt:
@@ -103,6 +111,7 @@ def test_streaming_endpoint():
     print(f"\n✅ Streaming test complete! Processed {event_count} events.")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(message)s")
     test_streaming_endpoint() 
 
 
@@ -3,13 +3,26 @@
 Generate a secure API key for the AI Hedge Fund API.
 """
 
+import base64
 import secrets
 import os
 
+# Random bytes per key; encoded as 43 URL-safe characters
+API_KEY_BYTES = 32
+
+
+def generate_api_keys(count: int) -> list[str]:
+    """Generate several secure API keys from a single read of the system CSPRNG."""
+    random_bytes = secrets.token_bytes(API_KEY_BYTES * count)
+    return [
+        base64.urlsafe_b64encode(random_bytes[i:i + API_KEY_BYTES]).rstrip(b"=").decode("ascii")
+        for i in range(0, len(random_bytes), API_KEY_BYTES)
+    ]
+
 
 def generate_api_key() -> str:
     """Generate a secure API key."""
-    return secrets.token_urlsafe(32)
+    return generate_api_keys(1)[0]
 
 
 def main():
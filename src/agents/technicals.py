@@ -8,10 +8,11 @@ import json
 import pandas as pd
 import numpy as np
 
-from src.tools.api import get_prices, prices_to_df
+from src.tools.api import get_price_data
 from src.utils.progress import progress
 from src.utils.weight_manager import get_current_weights, track_agent_weights, weight_tracker
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 
 def safe_float(value, default=0.0):
@@ -71,23 +72,27 @@ def technical_analyst_agent(state: AgentState):
     # Get current weights for this agent
     current_weights = get_current_weights("technical_analyst")
 
+    # Fetch price history for all tickers concurrently; get_prices spaces the API
+    # requests of all threads 2-4 seconds apart, so only the round-trips and
+    # DataFrame building overlap, not the rate-limit pacing
+    for ticker in tickers:
+        progress.update_status("technical_analyst_agent", ticker, "Fetching price data")
+    with ThreadPoolExecutor(max_workers=max(1, min(4, len(tickers)))) as pool:
+        price_frames = dict(zip(
+            tickers,
+            pool.map(lambda t: get_price_data(ticker=t, start_date=start_date, end_date=end_date), tickers),
+        ))
+
     for ticker in tickers:
         progress.update_status("technical_analyst_agent", ticker, "Analyzing price data")
 
-        # Get the historical price data
-        prices = get_prices(
-            ticker=ticker,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        # Get the historical price data as a DataFrame
+        prices_df = price_frames[ticker]
 
-        if not prices:
+        if prices_df.empty:
             progress.update_status("technical_analyst_agent", ticker, "Failed: No price data found")
             continue
 
-        # Convert prices to a DataFrame
-        prices_df = prices_to_df(prices)
-
         progress.update_status("technical_analyst_agent", ticker, "Calculating trend signals")
         trend_signals = calculate_trend_signals(prices_df)
 
@@ -223,17 +228,22 @@ def calculate_trend_signals(prices_df):
     # Calculate ADX for trend strength
     adx = calculate_adx(prices_df, 14)
 
+    # Only the latest bar drives the signal, so compare the last values
+    # instead of building full boolean series
+    ema_8_last, ema_21_last, ema_55_last = ema_8.iloc[-1], ema_21.iloc[-1], ema_55.iloc[-1]
+    adx_last = adx["adx"].iloc[-1]
+
     # Determine trend direction and strength
-    short_trend = ema_8 > ema_21
-    medium_trend = ema_21 > ema_55
+    short_trend = ema_8_last > ema_21_last
+    medium_trend = ema_21_last > ema_55_last
 
     # Combine signals with confidence weighting
-    trend_strength = adx["adx"].iloc[-1] / 100.0
+    trend_strength = adx_last / 100.0
 
-    if short_trend.iloc[-1] and medium_trend.iloc[-1]:
+    if short_trend and medium_trend:
         signal = "bullish"
         confidence = trend_strength
-    elif not short_trend.iloc[-1] and not medium_trend.iloc[-1]:
+    elif not short_trend and not medium_trend:
         signal = "bearish"
         confidence = trend_strength
     else:
@@ -244,7 +254,7 @@ def calculate_trend_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "adx": safe_float(adx["adx"].iloc[-1]),
+            "adx": safe_float(adx_last),
             "trend_strength": safe_float(trend_strength),
         },
     }
@@ -255,9 +265,11 @@ def calculate_mean_reversion_signals(prices_df):
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
     # Calculate z-score of price relative to moving average
-    ma_50 = prices_df["close"].rolling(window=50).mean()
-    std_50 = prices_df["close"].rolling(window=50).std()
-    z_score = (prices_df["close"] - ma_50) / std_50
+    close = prices_df["close"]
+    rolling_50 = close.rolling(window=50)
+    ma_50 = rolling_50.mean()
+    std_50 = rolling_50.std()
+    z_score = (close - ma_50) / std_50
 
     # Calculate Bollinger Bands
     bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
@@ -267,15 +279,17 @@ def calculate_mean_reversion_signals(prices_df):
     rsi_28 = calculate_rsi(prices_df, 28)
 
     # Mean reversion signals
-    price_vs_bb = (prices_df["close"].iloc[-1] - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
+    bb_lower_last = bb_lower.iloc[-1]
+    price_vs_bb = (prices_df["close"].iloc[-1] - bb_lower_last) / (bb_upper.iloc[-1] - bb_lower_last)
+    z_last = z_score.iloc[-1]
 
     # Combine signals
-    if z_score.iloc[-1] < -2 and price_vs_bb < 0.2:
+    if z_last < -2 and price_vs_bb < 0.2:
         signal = "bullish"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    elif z_score.iloc[-1] > 2 and price_vs_bb > 0.8:
+        confidence = min(abs(z_last) / 4, 1.0)
+    elif z_last > 2 and price_vs_bb > 0.8:
         signal = "bearish"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
+        confidence = min(abs(z_last) / 4, 1.0)
     else:
         signal = "neutral"
         confidence = 0.5
@@ -284,7 +298,7 @@ def calculate_mean_reversion_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "z_score": safe_float(z_score.iloc[-1]),
+            "z_score": safe_float(z_last),
             "price_vs_bb": safe_float(price_vs_bb),
             "rsi_14": safe_float(rsi_14.iloc[-1]),
             "rsi_28": safe_float(rsi_28.iloc[-1]),
@@ -309,11 +323,14 @@ def calculate_momentum_signals(prices_df):
     # Relative strength
     # (would compare to market/sector in real implementation)
 
+    mom_1m_last, mom_3m_last, mom_6m_last = mom_1m.iloc[-1], mom_3m.iloc[-1], mom_6m.iloc[-1]
+    volume_momentum_last = volume_momentum.iloc[-1]
+
     # Calculate momentum score
-    momentum_score = (0.4 * mom_1m + 0.3 * mom_3m + 0.3 * mom_6m).iloc[-1]
+    momentum_score = 0.4 * mom_1m_last + 0.3 * mom_3m_last + 0.3 * mom_6m_last
 
     # Volume confirmation
-    volume_confirmation = volume_momentum.iloc[-1] > 1.0
+    volume_confirmation = volume_momentum_last > 1.0
 
     if momentum_score > 0.05 and volume_confirmation:
         signal = "bullish"
@@ -329,10 +346,10 @@ def calculate_momentum_signals(prices_df):
         "signal": signal,
         "confidence": confidence,
         "metrics": {
-            "momentum_1m": safe_float(mom_1m.iloc[-1]),
-            "momentum_3m": safe_float(mom_3m.iloc[-1]),
-            "momentum_6m": safe_float(mom_6m.iloc[-1]),
-            "volume_momentum": safe_float(volume_momentum.iloc[-1]),
+            "momentum_1m": safe_float(mom_1m_last),
+            "momentum_3m": safe_float(mom_3m_last),
+            "momentum_6m": safe_float(mom_6m_last),
+            "volume_momentum": safe_float(volume_momentum_last),
         },
     }
 
@@ -401,11 +418,13 @@ def calculate_stat_arb_signals(prices_df):
     # Correlation analysis
     # (would include correlation with related securities in real implementation)
 
+    skew_last = skew.iloc[-1]
+
     # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
+    if hurst < 0.4 and skew_last > 1:
         signal = "bullish"
         confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
+    elif hurst < 0.4 and skew_last < -1:
         signal = "bearish"
         confidence = (0.5 - hurst) * 2
     else:
@@ -417,7 +436,7 @@ def calculate_stat_arb_signals(prices_df):
         "confidence": confidence,
         "metrics": {
             "hurst_exponent": safe_float(hurst),
-            "skewness": safe_float(skew.iloc[-1]),
+            "skewness": safe_float(skew_last),
             "kurtosis": safe_float(kurt.iloc[-1]),
         },
     }
@@ -515,26 +534,28 @@ def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     Returns:
         DataFrame with ADX values
     """
+    # Work on local Series so the caller's price frame is left untouched
+    high, low, close = df["high"], df["low"], df["close"]
+    prev_close = close.shift()
+
     # Calculate True Range
-    df["high_low"] = df["high"] - df["low"]
-    df["high_close"] = abs(df["high"] - df["close"].shift())
-    df["low_close"] = abs(df["low"] - df["close"].shift())
-    df["tr"] = df[["high_low", "high_close", "low_close"]].max(axis=1)
+    tr = np.fmax(np.fmax(high - low, abs(high - prev_close)), abs(low - prev_close))
 
     # Calculate Directional Movement
-    df["up_move"] = df["high"] - df["high"].shift()
-    df["down_move"] = df["low"].shift() - df["low"]
+    up_move = high - high.shift()
+    down_move = low.shift() - low
 
-    df["plus_dm"] = np.where((df["up_move"] > df["down_move"]) & (df["up_move"] > 0), df["up_move"], 0)
-    df["minus_dm"] = np.where((df["down_move"] > df["up_move"]) & (df["down_move"] > 0), df["down_move"], 0)
+    plus_dm = pd.Series(np.where((up_move > down_move) & (up_move > 0), up_move, 0), index=df.index)
+    minus_dm = pd.Series(np.where((down_move > up_move) & (down_move > 0), down_move, 0), index=df.index)
 
     # Calculate ADX
-    df["+di"] = 100 * (df["plus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["-di"] = 100 * (df["minus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["dx"] = 100 * abs(df["+di"] - df["-di"]) / (df["+di"] + df["-di"])
-    df["adx"] = df["dx"].ewm(span=period).mean()
+    tr_ewm = tr.ewm(span=period).mean()
+    plus_di = 100 * (plus_dm.ewm(span=period).mean() / tr_ewm)
+    minus_di = 100 * (minus_dm.ewm(span=period).mean() / tr_ewm)
+    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
+    adx = dx.ewm(span=period).mean()
 
-    return df[["adx", "+di", "-di"]]
+    return pd.DataFrame({"adx": adx, "+di": plus_di, "-di": minus_di})
 
 
 def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
@@ -548,12 +569,14 @@ def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
     Returns:
         pd.Series: ATR values
     """
+    prev_close = df["close"].shift()
     high_low = df["high"] - df["low"]
-    high_close = abs(df["high"] - df["close"].shift())
-    low_close = abs(df["low"] - df["close"].shift())
+    high_close = abs(df["high"] - prev_close)
+    low_close = abs(df["low"] - prev_close)
 
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
+    # Element-wise max of the three ranges; fmax skips the NaN in the first
+    # row the same way DataFrame.max(axis=1) does, without building a frame
+    true_range = np.fmax(np.fmax(high_low, high_close), low_close)
 
     return true_range.rolling(period).mean()
 
@@ -460,15 +460,14 @@ def calculate_intrinsic_value(financial_line_items: list) -> dict[str, any]:
     terminal_multiple = 12
     projection_years = 10
 
-    # Sum of discounted future owner earnings
-    future_value = 0
-    for year in range(1, projection_years + 1):
-        future_earnings = owner_earnings * (1 + growth_rate) ** year
-        present_value = future_earnings / (1 + discount_rate) ** year
-        future_value += present_value
+    # Sum of discounted future owner earnings: each year grows by the same ratio
+    # (1 + g) / (1 + r), so the sum is a geometric series with a closed form
+    ratio = (1 + growth_rate) / (1 + discount_rate)
+    ratio_n = ratio ** projection_years
+    future_value = owner_earnings * ratio * (1 - ratio_n) / (1 - ratio)
 
     # Terminal value
-    terminal_value = (owner_earnings * (1 + growth_rate) ** projection_years * terminal_multiple) / ((1 + discount_rate) ** projection_years)
+    terminal_value = owner_earnings * ratio_n * terminal_multiple
 
     intrinsic_value = future_value + terminal_value
 
@@ -5,6 +5,7 @@ class Cache:
         self._prices_cache: dict[str, list[dict[str, any]]] = {}
         self._financial_metrics_cache: dict[str, list[dict[str, any]]] = {}
         self._line_items_cache: dict[str, list[dict[str, any]]] = {}
+        self._line_item_searches: dict[str, list[dict[str, any]]] = {}
         self._insider_trades_cache: dict[str, list[dict[str, any]]] = {}
         self._company_news_cache: dict[str, list[dict[str, any]]] = {}
 
@@ -42,8 +43,22 @@ class Cache:
         return self._line_items_cache.get(ticker)
 
     def set_line_items(self, ticker: str, data: list[dict[str, any]]):
-        """Append new line items to cache."""
-        self._line_items_cache[ticker] = self._merge_data(self._line_items_cache.get(ticker), data, key_field="report_period")
+        """Merge new line items into cache, combining fields fetched for the same report."""
+        # Searches for different line items return the same reports with different
+        # fields, so reports are matched on period and their fields combined
+        merged = {(item["report_period"], item["period"]): item for item in self._line_items_cache.get(ticker) or []}
+        for item in data:
+            key = (item["report_period"], item["period"])
+            merged[key] = {**merged[key], **item} if key in merged else item
+        self._line_items_cache[ticker] = list(merged.values())
+
+    def get_line_item_searches(self, ticker: str) -> list[dict[str, any]] | None:
+        """Get the line item searches already answered by the API for a ticker."""
+        return self._line_item_searches.get(ticker)
+
+    def add_line_item_search(self, ticker: str, search: dict[str, any]):
+        """Record what a line item search asked for and which reports it returned."""
+        self._line_item_searches.setdefault(ticker, []).append(search)
 
     def get_insider_trades(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached insider trades if available."""
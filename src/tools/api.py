@@ -1,9 +1,14 @@
+import asyncio
 import datetime
+import httpx
+import logging
 import os
 import pandas as pd
 import requests
+import threading
 import time
 import random
+from functools import lru_cache
 
 from src.data.cache import get_cache
 from src.data.models import (
@@ -20,45 +25,70 @@ from src.data.models import (
     CompanyFactsResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 # Global cache instance
 _cache = get_cache()
 
+_API_BASE_URL = "https://api.financialdatasets.ai"
 
-def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
-    """Fetch price data from cache or API."""
-    # Check cache first
+
+def _cached_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Return cached prices in the date range as Price objects, empty if none are cached."""
     if cached_data := _cache.get_prices(ticker):
-        # Filter cached data by date range and convert to Price objects
-        filtered_data = [Price(**price) for price in cached_data if start_date <= price["time"] <= end_date]
-        if filtered_data:
-            return filtered_data
+        return [Price(**price) for price in cached_data if start_date <= price["time"] <= end_date]
+    return []
 
-    # If not in cache or no data in range, fetch from API
+
+def _prices_request(ticker: str, start_date: str, end_date: str) -> tuple[dict, dict]:
+    """Build the query parameters and headers for a /prices/ request."""
     headers = {}
     if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
         headers["X-API-KEY"] = api_key
 
-    url = f"https://api.financialdatasets.ai/prices/?ticker={ticker}&interval=day&interval_multiplier=1&start_date={start_date}&end_date={end_date}"
-    
-    # Add delay to prevent rate limiting (2-4 seconds)
-    time.sleep(random.uniform(2.0, 4.0))
-    
-    response = requests.get(url, headers=headers)
+    params = {
+        "ticker": ticker,
+        "interval": "day",
+        "interval_multiplier": 1,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    return params, headers
+
+
+# Price requests from every thread and event loop share one schedule, so parallel
+# callers are spaced out instead of all sleeping 2-4 seconds and firing together
+_price_pacing_lock = threading.Lock()
+_next_price_request_at = 0.0
+
+
+def _price_request_delay() -> float:
+    """Reserve the next /prices/ request slot and return the seconds to wait for it."""
+    global _next_price_request_at
+    with _price_pacing_lock:
+        now = time.monotonic()
+        # Add delay to prevent rate limiting (2-4 seconds), after the slot already taken
+        start = max(now + random.uniform(2.0, 4.0), _next_price_request_at)
+        _next_price_request_at = start + random.uniform(2.0, 4.0)
+    return start - now
+
+
+# Backoff before each retry of a rate-limited price request: (base seconds, jitter)
+_PRICE_RATE_LIMIT_BACKOFF = ((15, 10), (30, 15))
+
+
+def _rate_limit_wait(ticker: str, attempt: int) -> float:
+    """Seconds to wait before retry number attempt of a rate-limited price request."""
+    base_wait, jitter = _PRICE_RATE_LIMIT_BACKOFF[attempt]
+    wait_time = base_wait + random.uniform(0, jitter)
+    logger.warning(f"Rate limited fetching {ticker}, waiting {wait_time:.1f} seconds...")
+    return wait_time
+
+
+def _parse_prices(ticker: str, response: requests.Response | httpx.Response) -> list[Price]:
+    """Turn a /prices/ response from either HTTP client into Price objects and cache them."""
     if response.status_code == 404:
         return []  # Return empty list if no data is found
-    if response.status_code == 429:
-        # Rate limited - wait longer and retry with exponential backoff
-        wait_time = 15 + random.uniform(0, 10)  # 15-25 seconds
-        print(f"Rate limited fetching {ticker}, waiting {wait_time:.1f} seconds...")
-        time.sleep(wait_time)
-        response = requests.get(url, headers=headers)
-        
-        # If still rate limited, wait even longer
-        if response.status_code == 429:
-            wait_time = 30 + random.uniform(0, 15)  # 30-45 seconds
-            print(f"Still rate limited fetching {ticker}, waiting {wait_time:.1f} seconds...")
-            time.sleep(wait_time)
-            response = requests.get(url, headers=headers)
     if response.status_code != 200:
         raise Exception(f"Error fetching data: {ticker} - {response.status_code} - {response.text}")
 
@@ -74,6 +104,75 @@ def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
     return prices
 
 
+def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Fetch price data from cache or API."""
+    # Check cache first
+    if filtered_data := _cached_prices(ticker, start_date, end_date):
+        return filtered_data
+
+    # If not in cache or no data in range, fetch from API
+    params, headers = _prices_request(ticker, start_date, end_date)
+    url = f"{_API_BASE_URL}/prices/"
+
+    time.sleep(_price_request_delay())
+
+    response = requests.get(url, params=params, headers=headers)
+    for attempt in range(len(_PRICE_RATE_LIMIT_BACKOFF)):
+        if response.status_code != 429:
+            break
+        time.sleep(_rate_limit_wait(ticker, attempt))
+        response = requests.get(url, params=params, headers=headers)
+
+    return _parse_prices(ticker, response)
+
+
+_async_client: httpx.AsyncClient | None = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client, so API connections are pooled across calls."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            base_url=_API_BASE_URL,
+            # Quote lookups fall back to the full agent on failure, so a slow API
+            # should fail fast rather than stall the reply
+            timeout=5.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _async_client
+
+
+async def aclose_async_client() -> None:
+    """Close the shared async HTTP client, if one was created."""
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+
+async def aget_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Fetch price data from cache or API without blocking the event loop."""
+    # Check cache first
+    if filtered_data := _cached_prices(ticker, start_date, end_date):
+        return filtered_data
+
+    # If not in cache or no data in range, fetch from API
+    params, headers = _prices_request(ticker, start_date, end_date)
+    client = _get_async_client()
+
+    await asyncio.sleep(_price_request_delay())
+
+    response = await client.get("/prices/", params=params, headers=headers)
+    for attempt in range(len(_PRICE_RATE_LIMIT_BACKOFF)):
+        if response.status_code != 429:
+            break
+        await asyncio.sleep(_rate_limit_wait(ticker, attempt))
+        response = await client.get("/prices/", params=params, headers=headers)
+
+    return _parse_prices(ticker, response)
+
+
 def get_financial_metrics(
     ticker: str,
     end_date: str,
@@ -129,6 +228,26 @@ def get_financial_metrics(
     return financial_metrics
 
 
+def _cached_line_items(ticker: str, line_items: list[str], end_date: str, period: str, limit: int) -> list[LineItem]:
+    """Return cached reports for a search, empty unless an earlier search covers it."""
+    cached_data = _cache.get_line_items(ticker)
+    if not cached_data:
+        return []
+
+    reports = {(item["report_period"], item["period"]): item for item in cached_data}
+    for search in _cache.get_line_item_searches(ticker) or []:
+        # An earlier search covers this one if it asked for the same period and at least
+        # these fields, and was made for the same or a later end date
+        if search["period"] != period or search["end_date"] < end_date or not search["line_items"].issuperset(line_items):
+            continue
+        report_periods = sorted((report_period for report_period in search["report_periods"] if report_period <= end_date), reverse=True)
+        # Its reports are the latest ones up to its end date, so they answer this search
+        # if there are enough of them, or if the API had no more to give
+        if len(report_periods) >= limit or len(search["report_periods"]) < search["limit"]:
+            return [LineItem(**reports[(report_period, period)]) for report_period in report_periods[:limit]]
+    return []
+
+
 def search_line_items(
     ticker: str,
     line_items: list[str],
@@ -136,7 +255,11 @@ def search_line_items(
     period: str = "ttm",
     limit: int = 10,
 ) -> list[LineItem]:
-    """Fetch line items from API."""
+    """Fetch line items from cache or API."""
+    # Check cache first
+    if cached_data := _cached_line_items(ticker, line_items, end_date, period, limit):
+        return cached_data
+
     # If not in cache or insufficient data, fetch from API
     headers = {}
     if api_key := os.environ.get("FINANCIAL_DATASETS_API_KEY"):
@@ -170,7 +293,15 @@ def search_line_items(
     if not search_results:
         return []
 
-    # Cache the results
+    # Cache the results as dicts, along with what they answer
+    _cache.set_line_items(ticker, [item.model_dump() for item in search_results])
+    _cache.add_line_item_search(ticker, {
+        "line_items": frozenset(line_items),
+        "period": period,
+        "end_date": end_date,
+        "limit": limit,
+        "report_periods": [item.report_period for item in search_results],
+    })
     return search_results[:limit]
 
 
@@ -370,7 +501,25 @@ def prices_to_df(prices: list[Price]) -> pd.DataFrame:
     return df
 
 
-# Update the get_price_data function to use the new functions
-def get_price_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+def _build_price_df(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Fetch prices for a window as a DataFrame, empty if no data is found."""
     prices = get_prices(ticker, start_date, end_date)
+    if not prices:
+        return pd.DataFrame()
     return prices_to_df(prices)
+
+
+# Only closed windows are memoized: a window ending today can still gain prices
+@lru_cache(maxsize=32)
+def _get_historical_price_df(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Build the price DataFrame for a past window once; repeat lookups reuse it."""
+    return _build_price_df(ticker, start_date, end_date)
+
+
+# Update the get_price_data function to use the new functions
+def get_price_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Fetch prices as a DataFrame, empty if no data is found."""
+    if end_date >= datetime.datetime.now().strftime("%Y-%m-%d"):
+        return _build_price_df(ticker, start_date, end_date)
+    # Hand out a copy so callers adding columns don't alter the cached frame
+    return _get_historical_price_df(ticker, start_date, end_date).copy()
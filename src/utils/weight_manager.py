@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, asdict
 import sqlite3
+import threading
 from contextlib import contextmanager
 
 
@@ -156,11 +157,16 @@ class WeightTracker:
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
         self.db_path = self.storage_path / "weights.db"
+        self._local = threading.local()
         self._init_db()
         
     def _init_db(self):
         """Initialize SQLite database for weight tracking"""
         with self._get_db() as conn:
+            # Write-ahead logging is a property of the database file: commits append
+            # to the log instead of rewriting pages, and readers don't block writers
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS weight_snapshots (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -209,14 +215,24 @@ class WeightTracker:
     
     @contextmanager
     def _get_db(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Get this thread's database connection; the transaction commits on success"""
+        # Analyses record weights once per scoring function, so connections are
+        # kept open and reused; SQLite connections belong to the thread that
+        # opened them, so each thread has its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            # Every analysis records its weights in its own transaction; in WAL mode,
+            # NORMAL syncs at checkpoints instead of on each of those commits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
         try:
             yield conn
             conn.commit()
-        finally:
-            conn.close()
+        except BaseException:
+            conn.rollback()
+            raise
     
     def create_session(self, session_id: str, session_type: str, tickers: List[str], 
                       start_date: str, end_date: str, selected_agents: List[str]) -> Dict[str, Any]:
@@ -392,15 +408,18 @@ class WeightTracker:
             
             if agent_name:
                 query += " WHERE agent_name = ?"
-                rows = conn.execute(query + " GROUP BY agent_name, weights", (agent_name,)).fetchall()
+                cursor = conn.execute(query + " GROUP BY agent_name, weights", (agent_name,))
             else:
-                rows = conn.execute(query + " GROUP BY agent_name, weights").fetchall()
+                cursor = conn.execute(query + " GROUP BY agent_name, weights")
             
+            # One entry per distinct weight combination, which grows with history;
+            # rows are read in batches instead of materializing them all first
             results = []
-            for row in rows:
-                row_dict = dict(row)
-                row_dict['weights'] = json.loads(row_dict['weights'])
-                results.append(row_dict)
+            for rows in iter(lambda: cursor.fetchmany(256), []):
+                for row in rows:
+                    row_dict = dict(row)
+                    row_dict['weights'] = json.loads(row_dict['weights'])
+                    results.append(row_dict)
             
             return {
                 "weight_performance": results,
@@ -16,6 +16,9 @@ sys.path.insert(0, str(parent_dir))
 
 from app.backend.services.chat_agent import process_financial_query
 
+# One keep-alive connection pool shared by every request this script makes
+session = requests.Session()
+
 async def test_direct_agent():
     """Test the chat agent directly without going through FastAPI."""
     print("🧪 Testing Direct Agent Call")
@@ -49,7 +52,7 @@ def test_api_endpoint():
     
     # Check if server is running
     try:
-        health_response = requests.get("https://aeeroooo-production.up.railway.app/health", timeout=5)
+        health_response = session.get("https://aeeroooo-production.up.railway.app/health", timeout=5)
         if health_response.status_code != 200:
             print("❌ Server not healthy")
             return None
@@ -80,7 +83,7 @@ def test_api_endpoint():
         print(f"Query: {query}")
         print("Sending request to API...")
         
-        response = requests.post(
+        response = session.post(
             "https://aeeroooo-production.up.railway.app/chat/analyze",
             json=payload,
             headers=headers,
@@ -113,7 +116,7 @@ def test_examples_endpoint():
     print("=" * 50)
     
     try:
-        response = requests.get("https://aeeroooo-production.up.railway.app/chat/examples", timeout=5)
+        response = session.get("https://aeeroooo-production.up.railway.app/chat/examples", timeout=5)
         
         if response.status_code == 200:
             examples = response.json()
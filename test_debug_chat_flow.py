@@ -15,6 +15,9 @@ BACKEND_URL = "http://localhost:8000"
 API_KEY = "Pb9RPNoA1neVLA6teD-GFTbUh8EI9TFe5QK9aN3z_Aw"
 TEST_QUERY = "what do you think of NVIDIA's valuation"
 
+# One keep-alive connection pool shared by every request this script makes
+session = requests.Session()
+
 def log_with_timestamp(message, level="INFO"):
     """Add timestamp to log messages"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
@@ -25,7 +28,7 @@ def test_backend_health():
     log_with_timestamp("=== TESTING BACKEND HEALTH ===")
     
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=5)
+        response = session.get(f"{BACKEND_URL}/health", timeout=5)
         log_with_timestamp(f"Health check status: {response.status_code}")
         log_with_timestamp(f"Health check response: {response.text}")
         return response.status_code == 200
@@ -38,7 +41,7 @@ def test_warren_buffett_agent_health():
     log_with_timestamp("=== TESTING WARREN BUFFETT AGENT HEALTH ===")
     
     try:
-        response = requests.get(f"{BACKEND_URL}/warren-buffett/health", timeout=5)
+        response = session.get(f"{BACKEND_URL}/warren-buffett/health", timeout=5)
         log_with_timestamp(f"Warren Buffett health status: {response.status_code}")
         log_with_timestamp(f"Warren Buffett health response: {response.text}")
         return response.status_code == 200
@@ -51,7 +54,7 @@ def test_warren_buffett_capabilities():
     log_with_timestamp("=== TESTING WARREN BUFFETT CAPABILITIES ===")
     
     try:
-        response = requests.get(f"{BACKEND_URL}/warren-buffett/capabilities", timeout=5)
+        response = session.get(f"{BACKEND_URL}/warren-buffett/capabilities", timeout=5)
         log_with_timestamp(f"Capabilities status: {response.status_code}")
         if response.status_code == 200:
             capabilities = response.json()
@@ -77,7 +80,7 @@ def test_simple_analyze_endpoint():
         log_with_timestamp(f"Headers: {headers}")
         log_with_timestamp(f"URL: {BACKEND_URL}/warren-buffett/analyze?query={TEST_QUERY}")
         
-        response = requests.post(
+        response = session.post(
             f"{BACKEND_URL}/warren-buffett/analyze",
             params={"query": TEST_QUERY},
             headers=headers,
@@ -120,7 +123,7 @@ def test_streaming_analyze_endpoint():
         log_with_timestamp(f"Sending streaming request")
         log_with_timestamp(f"Payload: {json.dumps(payload, indent=2)}")
         
-        response = requests.post(
+        response = session.post(
             f"{BACKEND_URL}/warren-buffett/analyze-streaming",
             json=payload,
             headers=headers,
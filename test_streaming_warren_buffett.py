@@ -9,6 +9,10 @@ import json
 import httpx
 from datetime import datetime
 
+# Optional pause after each displayed event (seconds). The server already paces
+# the stream, so by default events are shown as fast as they arrive.
+DISPLAY_DELAY = 0.0
+
 async def test_streaming_analysis():
     """Test the streaming Warren Buffett analysis endpoint."""
     
@@ -53,18 +57,92 @@ async def test_streaming_analysis():
                     if line.strip() and line.startswith("data: "):
                         # Parse the JSON data
                         data_str = line[6:]  # Remove "data: " prefix
-                        try:
-                            event = json.loads(data_str)
-                            await display_event(event)
-                        except json.JSONDecodeError:
+                        # Only object payloads are events; skip the parser for plain text
+                        if data_str[:1] != "{":
                             print(f"📄 Raw data: {data_str}")
+                        else:
+                            try:
+                                event = json.loads(data_str)
+                                await display_event(event)
+                            except json.JSONDecodeError:
+                                print(f"📄 Raw data: {data_str}")
                         
-                        # Small delay for readability
-                        await asyncio.sleep(0.2)
+                        if DISPLAY_DELAY:
+                            await asyncio.sleep(DISPLAY_DELAY)
                 
         except Exception as e:
             print(f"❌ Error during streaming: {str(e)}")
 
+def _show_start(time_str: str, data: dict, step):
+    print(f"🎯 [{time_str}] {data.get('message', 'Starting analysis...')}")
+    print(f"   Query: {data.get('query', '')}")
+
+def _show_agent_thinking(time_str: str, data: dict, step):
+    print(f"💭 [{time_str}] {data.get('thought', '')}")
+
+def _show_llm_thinking(time_str: str, data: dict, step):
+    print(f"🤔 [{time_str}] {data.get('message', 'AI is thinking...')}")
+    if step:
+        print(f"   Step: {step}")
+
+def _show_llm_token(time_str: str, data: dict, step):
+    # Tokens arrive in small batches; print them as a running line
+    print(data.get("content", ""), end="", flush=True)
+
+def _show_llm_thought(time_str: str, data: dict, step):
+    print(f"💡 [{time_str}] Thought: {data.get('thought', '')}")
+
+def _show_agent_action(time_str: str, data: dict, step):
+    print(f"🔧 [{time_str}] Using tool: {data.get('tool', '')}")
+    print(f"   Input: {data.get('tool_input', '')}")
+
+def _show_tool_start(time_str: str, data: dict, step):
+    print(f"⚡ [{time_str}] Running {data.get('tool_name', '')}...")
+    print(f"   Analyzing: {data.get('input', '')}")
+
+def _show_tool_end(time_str: str, data: dict, step):
+    output = data.get("output", "")
+    print(f"📊 [{time_str}] Analysis data received")
+    if len(output) > 100:
+        print(f"   Data: {output[:100]}...")
+    else:
+        print(f"   Data: {output}")
+
+def _show_agent_finish(time_str: str, data: dict, step):
+    print(f"✅ [{time_str}] Analysis complete!")
+
+def _show_complete(time_str: str, data: dict, step):
+    print(f"\n🎯 [{time_str}] FINAL RESPONSE:")
+    print("=" * 50)
+    print(data.get("response", ""))
+    print("=" * 50)
+
+def _show_error(time_str: str, data: dict, step):
+    print(f"❌ [{time_str}] Error: {data.get('error', '')}")
+
+def _show_heartbeat(time_str: str, data: dict, step):
+    print(f"💓 [{time_str}] {data.get('message', 'Processing...')}")
+
+def _show_stream_end(time_str: str, data: dict, step):
+    print(f"\n🏁 [{time_str}] Stream completed")
+
+# Event type -> display handler
+EVENT_HANDLERS = {
+    "start": _show_start,
+    "agent_thinking": _show_agent_thinking,
+    "llm_thinking": _show_llm_thinking,
+    "llm_token": _show_llm_token,
+    "llm_thought": _show_llm_thought,
+    "agent_action": _show_agent_action,
+    "tool_start": _show_tool_start,
+    "tool_end": _show_tool_end,
+    "agent_finish": _show_agent_finish,
+    "complete": _show_complete,
+    "error": _show_error,
+    "heartbeat": _show_heartbeat,
+    "stream_end": _show_stream_end,
+}
+
 async def display_event(event: dict):
     """Display streaming events in a user-friendly format."""
     
@@ -82,65 +160,11 @@ async def display_event(event: dict):
         except:
             time_str = timestamp
     
-    if event_type == "start":
-        print(f"🎯 [{time_str}] {data.get('message', 'Starting analysis...')}")
-        print(f"   Query: {data.get('query', '')}")
-        
-    elif event_type == "agent_thinking":
-        thought = data.get("thought", "")
-        print(f"💭 [{time_str}] {thought}")
-        
-    elif event_type == "llm_thinking":
-        print(f"🤔 [{time_str}] {data.get('message', 'AI is thinking...')}")
-        if step:
-            print(f"   Step: {step}")
-            
-    elif event_type == "llm_thought":
-        thought = data.get("thought", "")
-        print(f"💡 [{time_str}] Thought: {thought}")
-        
-    elif event_type == "agent_action":
-        tool = data.get("tool", "")
-        tool_input = data.get("tool_input", "")
-        print(f"🔧 [{time_str}] Using tool: {tool}")
-        print(f"   Input: {tool_input}")
-        
-    elif event_type == "tool_start":
-        tool_name = data.get("tool_name", "")
-        input_data = data.get("input", "")
-        print(f"⚡ [{time_str}] Running {tool_name}...")
-        print(f"   Analyzing: {input_data}")
-        
-    elif event_type == "tool_end":
-        output = data.get("output", "")
-        print(f"📊 [{time_str}] Analysis data received")
-        if len(output) > 100:
-            print(f"   Data: {output[:100]}...")
-        else:
-            print(f"   Data: {output}")
-            
-    elif event_type == "agent_finish":
-        print(f"✅ [{time_str}] Analysis complete!")
-        
-    elif event_type == "complete":
-        response = data.get("response", "")
-        print(f"\n🎯 [{time_str}] FINAL RESPONSE:")
-        print("=" * 50)
-        print(response)
-        print("=" * 50)
-        
-    elif event_type == "error":
-        error = data.get("error", "")
-        print(f"❌ [{time_str}] Error: {error}")
-        
-    elif event_type == "heartbeat":
-        print(f"💓 [{time_str}] {data.get('message', 'Processing...')}")
-        
-    elif event_type == "stream_end":
-        print(f"\n🏁 [{time_str}] Stream completed")
-        
-    else:
+    handler = EVENT_HANDLERS.get(event_type)
+    if handler is None:
         print(f"📄 [{time_str}] {event_type}: {data}")
+    else:
+        handler(time_str, data, step)
 
 async def test_direct_streaming():
     """Test streaming directly without HTTP (for development)."""
@@ -160,7 +184,8 @@ async def test_direct_streaming():
         async for event_json in agent.analyze_streaming(query):
             event = json.loads(event_json)
             await display_event(event)
-            await asyncio.sleep(0.1)  # Small delay for readability
+            if DISPLAY_DELAY:
+                await asyncio.sleep(DISPLAY_DELAY)
             
     except Exception as e:
         print(f"❌ Direct streaming test failed: {str(e)}")
@@ -13,12 +13,15 @@ WARREN_BUFFETT_ENDPOINT = f"{BASE_URL}/warren-buffett/analyze"
 CAPABILITIES_ENDPOINT = f"{BASE_URL}/warren-buffett/capabilities"
 HEALTH_ENDPOINT = f"{BASE_URL}/warren-buffett/health"
 
+# One keep-alive connection pool shared by every request this script makes
+session = requests.Session()
+
 def test_health_check():
     """Test Warren Buffett agent health check."""
     print("🏥 Testing Warren Buffett agent health check...")
     
     try:
-        response = requests.get(HEALTH_ENDPOINT)
+        response = session.get(HEALTH_ENDPOINT)
         response.raise_for_status()
         
         result = response.json()
@@ -34,7 +37,7 @@ def test_capabilities():
     print("\n🔍 Testing Warren Buffett agent capabilities...")
     
     try:
-        response = requests.get(CAPABILITIES_ENDPOINT)
+        response = session.get(CAPABILITIES_ENDPOINT)
         response.raise_for_status()
         
         result = response.json()
@@ -60,7 +63,7 @@ def test_warren_buffett_analysis(query: str, description: str):
             "chat_history": []
         }
         
-        response = requests.post(
+        response = session.post(
             WARREN_BUFFETT_ENDPOINT, 
             json=payload,
             headers={"Content-Type": "application/json"}
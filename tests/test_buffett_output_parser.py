@@ -0,0 +1,50 @@
+import pytest
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+from app.backend.services.warren_buffett_chat_agent import _BuffettOutputParser
+
+parser = _BuffettOutputParser()
+
+
+def test_tool_call_is_parsed_as_action():
+    result = parser.parse("Thought: Do I need to use a tool? Yes\nAction: get_stock_quote\nAction Input: AAPL")
+    assert isinstance(result, AgentAction)
+    assert result.tool == "get_stock_quote"
+
+
+def test_answer_after_no_is_final_answer():
+    result = parser.parse("Thought: Do I need to use a tool? No\n## Apple\n\nA wonderful business.")
+    assert isinstance(result, AgentFinish)
+    assert result.return_values["output"] == "## Apple\n\nA wonderful business."
+
+
+def test_plain_answer_is_final_answer():
+    result = parser.parse("Apple has a durable moat.")
+    assert isinstance(result, AgentFinish)
+    assert result.return_values["output"] == "Apple has a durable moat."
+
+
+def test_reasoning_after_yes_goes_back_to_the_llm():
+    with pytest.raises(OutputParserException):
+        parser.parse("Thought: Do I need to use a tool? Yes\nI should look at the moat before answering.")
+
+
+def test_unanswered_tool_question_goes_back_to_the_llm():
+    with pytest.raises(OutputParserException):
+        parser.parse("Thought: Do I need to use a tool?\nLet me think about Apple.")
+
+
+def test_truncated_thought_goes_back_to_the_llm():
+    with pytest.raises(OutputParserException):
+        parser.parse("Thought: I should check the moat first…")
+
+
+def test_malformed_action_goes_back_to_the_llm():
+    with pytest.raises(OutputParserException):
+        parser.parse("Thought: Do I need to use a tool? Yes\nAction: get_stock_quote")
+
+
+def test_no_without_answer_goes_back_to_the_llm():
+    with pytest.raises(OutputParserException):
+        parser.parse("Thought: Do I need to use a tool? No")
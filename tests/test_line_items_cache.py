@@ -0,0 +1,78 @@
+from src.data.cache import Cache
+from src.tools import api
+
+# Annual reports the fake API knows about, newest first
+REPORT_PERIODS = ["2024-12-31", "2023-12-31", "2022-12-31", "2021-12-31", "2020-12-31"]
+
+
+class FakeResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+def fake_line_items_api(monkeypatch, report_periods=REPORT_PERIODS):
+    """Serve line item searches from report_periods and return the list of request bodies."""
+    requests_made = []
+
+    def post(url, headers=None, json=None):
+        requests_made.append(json)
+        matching = [report_period for report_period in report_periods if report_period <= json["end_date"]][: json["limit"]]
+        results = [{"ticker": json["tickers"][0], "report_period": report_period, "period": json["period"], "currency": "USD", **{name: 1.0 for name in json["line_items"]}} for report_period in matching]
+        return FakeResponse({"search_results": results})
+
+    monkeypatch.setattr(api, "_cache", Cache())
+    monkeypatch.setattr(api.requests, "post", post)
+    monkeypatch.setattr(api.time, "sleep", lambda seconds: None)
+    return requests_made
+
+
+def report_periods_of(items):
+    return [item.report_period for item in items]
+
+
+def test_smaller_earlier_search_does_not_answer_larger_limit(monkeypatch):
+    requests_made = fake_line_items_api(monkeypatch)
+
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=2)) == REPORT_PERIODS[:2]
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=4)) == REPORT_PERIODS[:4]
+    assert len(requests_made) == 2
+
+    # The second search covers any narrower one
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=3)) == REPORT_PERIODS[:3]
+    assert len(requests_made) == 2
+
+
+def test_earlier_end_date_does_not_answer_later_one(monkeypatch):
+    requests_made = fake_line_items_api(monkeypatch)
+
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2022-12-31", period="annual", limit=2)) == ["2022-12-31", "2021-12-31"]
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=2)) == ["2024-12-31", "2023-12-31"]
+    assert len(requests_made) == 2
+
+    # A later search answers an earlier end date when it holds enough reports before it
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2023-12-31", period="annual", limit=1)) == ["2023-12-31"]
+    assert len(requests_made) == 2
+
+
+def test_short_history_is_served_from_cache(monkeypatch):
+    requests_made = fake_line_items_api(monkeypatch, report_periods=REPORT_PERIODS[:3])
+
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=10)) == REPORT_PERIODS[:3]
+    # The API returned fewer reports than asked for, so the cache holds the whole history
+    assert report_periods_of(api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=10)) == REPORT_PERIODS[:3]
+    assert len(requests_made) == 1
+
+
+def test_search_for_other_fields_is_not_reused(monkeypatch):
+    requests_made = fake_line_items_api(monkeypatch)
+
+    api.search_line_items("AAPL", ["net_income"], "2024-12-31", period="annual", limit=2)
+    items = api.search_line_items("AAPL", ["net_income", "revenue"], "2024-12-31", period="annual", limit=2)
+    assert len(requests_made) == 2
+    assert all(item.revenue == 1.0 for item in items)